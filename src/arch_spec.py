@@ -1,12 +1,31 @@
 # author: Sahand Kashani <sahand.kashani@epfl.ch>
 
 import abc
+import functools
+from dataclasses import dataclass
 
 import helpers
 import resources
 from arch_names import ArchName
 
 
+# Bit position (shift) and mask of every field of the FAR register. This is what
+# is needed to pack/unpack FARs and is computed once per spec (see ArchSpec.far_layout).
+@dataclass(frozen=True)
+class FarLayout:
+  reserved_shift: int
+  reserved_mask: int
+  block_type_shift: int
+  block_type_mask: int
+  row_shift: int
+  row_mask: int
+  col_shift: int
+  col_mask: int
+  minor_shift: int
+  minor_mask: int
+  # Number of bits in the FAR register.
+  width: int
+
 # Abstract architecture.
 class ArchSpec(abc.ABC):
   @abc.abstractmethod
@@ -68,6 +87,22 @@ class ArchSpec(abc.ABC):
   def frame_size_words(self) -> int:
     raise NotImplementedError
 
+  @functools.cached_property
+  def far_layout(self) -> FarLayout:
+    return FarLayout(
+      reserved_shift=self.far_reserved_idx_low(),
+      reserved_mask=(1 << self.far_reserved_width()) - 1,
+      block_type_shift=self.far_block_type_idx_low(),
+      block_type_mask=(1 << self.far_block_type_width()) - 1,
+      row_shift=self.far_row_address_idx_low(),
+      row_mask=(1 << self.far_row_address_width()) - 1,
+      col_shift=self.far_column_address_idx_low(),
+      col_mask=(1 << self.far_column_address_width()) - 1,
+      minor_shift=self.far_minor_address_idx_low(),
+      minor_mask=(1 << self.far_minor_address_width()) - 1,
+      width=self.far_reserved_idx_high() + 1
+    )
+
   @staticmethod
   def num_clb_per_column() -> int:
     # UG574: UltraScale Architecture Configurable Logic Block (pg 11)
@@ -3,6 +3,7 @@
 import gzip
 import itertools as iter
 import math
+import mmap
 from collections import defaultdict
 from pathlib import Path
 
@@ -169,7 +170,7 @@ class Bitstream:
     # requested.
     self._has_crc: bool | None = None
     self._is_per_frame_crc: bool | None = None
-    self._idcodes: set[int] = set()
+    self._idcodes: set[int] | None = None
     self._raw_configuration_arrays: RawConfigurationArrays | None = None
     self._individual_configuration_arrays: IndividualConfigurationArrays | None = None
 
@@ -190,8 +191,11 @@ class Bitstream:
       with gzip.open(bitstream_path, "rb") as f:
         data = f.read()
     else:
+      # Uncompressed bitstreams are memory-mapped instead of read. The OS pages the
+      # file in on demand and the numpy arrays we create are views into the mapping.
       with open(bitstream_path, "rb") as f:
-        data = f.read()
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+      return Bitstream(np.frombuffer(data, dtype=np.uint8))
 
     return Bitstream.from_string(data)
 
@@ -202,7 +206,9 @@ class Bitstream:
     # We parse the bitstream as uint8 (instead of uint32) as it contains unsynchronized
     # data and we must look for the SYNC WORD before we can interpret the contents
     # as 32-bit words.
-    byte_bitstream = np.fromstring(bstr, dtype=np.uint8)
+    # The bytes are wrapped without a copy. Word-level views of the array are created
+    # later on (with the big-endian dtype) so words are never decoded one by one.
+    byte_bitstream = np.frombuffer(bstr, dtype=np.uint8)
     return Bitstream(byte_bitstream)
 
   # Finds the byte offsets of all SYNC WORDs in the given array.
@@ -483,7 +489,7 @@ class Bitstream:
   def get_idcodes(
     self
   ) -> set[int]:
-    if len(self._idcodes) == 0:
+    if self._idcodes is None:
       idcodes = set()
 
       for packet in self.packets:
@@ -568,19 +574,24 @@ class Bitstream:
 
       raw_config = self.get_raw_configuration_arrays()
       for (idcode, baseFars_dict) in raw_config.items():
-        for (far, byteOfstConfigArrayList) in baseFars_dict.items():
+        for (base_far, byteOfstConfigArrayList) in baseFars_dict.items():
           for (base_byte_ofst, config_array) in byteOfstConfigArrayList:
-
             # A config array can contain multiple frames back-to-back. We split the
             # large array into individual frames and assign a dedicated FAR to each
             # here.
             singleframes = config_array.reshape(-1, ar_spec.frame_size_words())
 
+            # The FARs of all frames in the config array are computed in one go. There
+            # are at most as many FARs as frames (padding frames do not consume a FAR).
+            (fars_int, fars_is_last_of_row) = far_incrementer.increment_many(idcode, base_far.to_int(), len(singleframes))
+            fars_idx = 0
+
             singleframes_idx = 0
             while singleframes_idx < len(singleframes):
               frame = singleframes[singleframes_idx]
               frame_byte_ofst = base_byte_ofst + singleframes_idx * ar_spec.frame_size_words() * singleframes.itemsize
 
+              far = FrameAddressRegister.from_int(int(fars_int[fars_idx]), ar_spec)
               config_frame = ConfigFrame(frame_byte_ofst, frame, far, ar_spec)
 
               # Keep track of frame as belonging to specific IDCODE.
@@ -588,7 +599,7 @@ class Bitstream:
               idcode_far_frames[idcode][config_frame.far].append(config_frame)
               singleframes_idx += 1
 
-              if far_incrementer.is_last_far_of_row(idcode, far):
+              if fars_is_last_of_row[fars_idx]:
                 # There are empty padding frames at the end of every row. We must
                 # skip them in the next iterations otherwise we'll offset the
                 # configuration frames.
@@ -601,7 +612,7 @@ class Bitstream:
                   singleframes_idx += 1
 
               # Auto-increment FAR after every frame since this is a write to FDRI.
-              far = far_incrementer.increment(idcode, far)
+              fars_idx += 1
 
       self._individual_configuration_arrays = idcode_far_frames
 
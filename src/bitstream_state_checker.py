@@ -3,6 +3,8 @@
 import argparse
 from pathlib import Path
 
+import numpy as np
+
 import helpers
 import resources
 from bit_locator import BitLocator
@@ -77,11 +79,11 @@ def reconstruct_bram_mem_initialization(
 ) -> str:
   bram = Bram()
 
-  for (idx, (far, frame_ofst)) in enumerate(zip(fars, frame_ofsts)):
-    key = (slr_name, far)
-    frame = slrNameFar_frame_dict[key]
-    bit_value = frame.bit(frame_ofst)
-    bram.set_mem_bit(idx, bit_value)
+  bit_values = np.array([
+    slrNameFar_frame_dict[(slr_name, far)].bit(frame_ofst)
+    for (far, frame_ofst) in zip(fars, frame_ofsts)
+  ])
+  bram.set_mem_bits(np.arange(len(bit_values)), bit_values)
 
   return bram.mem_to_hex()
 
@@ -93,11 +95,11 @@ def reconstruct_bram_parity_initialization(
 ) -> str:
   bram = Bram()
 
-  for (idx, (far, frame_ofst)) in enumerate(zip(fars, frame_ofsts)):
-    key = (slr_name, far)
-    frame = slrNameFar_frame_dict[key]
-    bit_value = frame.bit(frame_ofst)
-    bram.set_parity_bit(idx, bit_value)
+  bit_values = np.array([
+    slrNameFar_frame_dict[(slr_name, far)].bit(frame_ofst)
+    for (far, frame_ofst) in zip(fars, frame_ofsts)
+  ])
+  bram.set_parity_bits(np.arange(len(bit_values)), bit_values)
 
   return bram.parity_to_hex()
 
@@ -1,9 +1,12 @@
 # author: Sahand Kashani <sahand.kashani@epfl.ch>
 
 import argparse
+import typing
 from collections import defaultdict
 from pathlib import Path
 
+import numpy as np
+
 import packet as pkt
 import packet_spec as pkt_spec
 from arch_spec import ArchSpec
@@ -23,7 +26,9 @@ def extract_all_frame_addresses(
   ar_spec = ArchSpec.create_spec(bitstream.header.fpga_part)
 
   # Extract all FARs from bitstream.
-  idcode_fars_dict: dict[int, list[FrameAddressRegister]] = defaultdict(list)
+  # FARs are kept as ints until they are deduplicated as ints are much cheaper to
+  # deduplicate and sort.
+  idcode_farsInt_dict: dict[int, list[int]] = defaultdict(list)
   current_idcode: int = None
   for packet in bitstream._packets:
     if pkt.is_reg_write_pkt(packet, pkt_spec.Register.IDCODE):
@@ -37,34 +42,44 @@ def extract_all_frame_addresses(
         # to valid frame addresses.
         far_is_valid = (current_far.block_type == FarBlockType.CLB_IO_CLK) or (current_far.block_type == FarBlockType.BRAM_CONTENT)
         if far_is_valid:
-          idcode_fars_dict[current_idcode].append(current_far)
+          idcode_farsInt_dict[current_idcode].append(packet.data[0])
 
   # Eliminate duplicate FARs (will happen in multi-SLR devices) and sort to have all FARs in order.
-  for idcode in idcode_fars_dict:
-    fars = idcode_fars_dict[idcode]
-    # We convert the FARs to ints before removing duplicates as FARs themselves are not hashable.
-    fars_int = [far.to_int() for far in fars]
-    uniq_fars_int = set(fars_int)
-    uniq_sorted_fars_int = sorted(list(uniq_fars_int))
-    idcode_fars_dict[idcode] = [FrameAddressRegister.from_int(far_int, ar_spec) for far_int in uniq_sorted_fars_int]
+  idcode_fars_dict: dict[int, list[FrameAddressRegister]] = {
+    idcode: [FrameAddressRegister.from_int(far_int, ar_spec) for far_int in uniq_sorted_fars_int(fars_int)]
+    for (idcode, fars_int) in idcode_farsInt_dict.items()
+  }
 
   # Emit output file.
   dump_fars(idcode_fars_dict, out_fars_csv)
 
+# Returns the unique FARs of the input in ascending order.
+def uniq_sorted_fars_int(
+  fars_int: list[int]
+) -> list[int]:
+  # np.unique() deduplicates and sorts in a single pass in C. We convert back to
+  # python ints as numpy ints create problems for serialization in other places
+  # in the code.
+  return np.unique(np.asarray(fars_int, dtype=np.uint32)).tolist()
+
 def dump_fars(
   idcode_fars: dict[int, list[FrameAddressRegister]],
   filename_out: str
 ) -> None:
-  lines: list[str] = list()
-
-  csv_hdr = f"IDCODE,FAR,RESERVED,BLOCK_TYPE,ROW_ADDR,COL_ADDR,MINOR_ADDR"
-  lines.append(csv_hdr)
-  for (idcode, fars) in idcode_fars.items():
-    for far in fars:
-      lines.append(f"0x{idcode:0>8x},0x{far.to_hex()},{far.reserved},{far.block_type.name},{far.row_addr},{far.col_addr},{far.minor_addr}")
+  # Lines are generated lazily and streamed to the file so the full CSV is never
+  # materialized in memory.
+  def gen_lines() -> typing.Iterator[str]:
+    csv_hdr = f"IDCODE,FAR,RESERVED,BLOCK_TYPE,ROW_ADDR,COL_ADDR,MINOR_ADDR"
+    yield csv_hdr
+    for (idcode, fars) in idcode_fars.items():
+      idcode_hex = f"0x{idcode:0>8x}"
+      for far in fars:
+        # The newline is emitted before every row (rather than after) so the file
+        # does not end with a newline.
+        yield f"\n{idcode_hex},0x{far.to_hex()},{far.reserved},{far.block_type.name},{far.row_addr},{far.col_addr},{far.minor_addr}"
 
   with open(filename_out, "w") as f:
-    f.write("\n".join(lines))
+    f.writelines(gen_lines())
 
 # Main program (if executed as script)
 if __name__ == "__main__":
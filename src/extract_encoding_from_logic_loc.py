@@ -8,7 +8,6 @@ from pathlib import Path
 
 import format_json
 from arch_spec import ArchSpec
-from frame import FrameAddressRegister
 from logic_location import (BitLoc, BramLoc, BramMemLoc, BramMemParityLoc,
                             BramRegLoc, LogicLocationFile, LutramLoc, RegLoc)
 
@@ -36,22 +35,20 @@ def fars_are_valid_for_encoding_extraction(
   bit_locs: list[BitLoc],
   ar_spec: ArchSpec
 ) -> bool:
+  # Just the minor address can differ! All other FAR fields (reserved, block
+  # type, row, col) are contiguous bit ranges of the FAR, so we can compare them
+  # all at once by masking out the minor address instead of decoding every FAR.
+  layout = ar_spec.far_layout
+  minor_mask = layout.minor_mask << layout.minor_shift
+  non_minor_mask = ~minor_mask
+
   # References
   ref_bit_loc = bit_locs[0]
-  ref_far = FrameAddressRegister.from_int(ref_bit_loc.frame_addr, ar_spec)
+  ref_slr_number = ref_bit_loc.slr_number
+  ref_non_minor = ref_bit_loc.frame_addr & non_minor_mask
 
   for bit_loc in bit_locs:
-    far = FrameAddressRegister.from_int(bit_loc.frame_addr, ar_spec)
-
-    # Just the minor address can differ!
-    slr_valid = bit_loc.slr_number == ref_bit_loc.slr_number
-    reserved_valid = far.reserved == ref_far.reserved
-    block_type_valid = far.block_type == ref_far.block_type
-    row_addr_valid = far.row_addr == ref_far.row_addr
-    col_addr_valid = far.col_addr == ref_far.col_addr
-
-    valid = all([slr_valid, reserved_valid, block_type_valid, row_addr_valid, col_addr_valid])
-    if not valid:
+    if (bit_loc.slr_number != ref_slr_number) or ((bit_loc.frame_addr & non_minor_mask) != ref_non_minor):
       return False
 
   return True
@@ -68,6 +65,26 @@ def bram_blocks_valid_for_encoding_extraction(
 
   return True
 
+# Extracts the minor address of every bit location's FAR. The minor address is
+# the only FAR field the encodings depend on (all others are constant within a
+# column), so we compute it once per bit location with a shift and mask rather
+# than decoding a full FAR for every bit in every encoder.
+def get_minor_addrs(
+  bit_locs: list[BitLoc],
+  ar_spec: ArchSpec
+) -> list[int]:
+  layout = ar_spec.far_layout
+  return [(bit_loc.frame_addr >> layout.minor_shift) & layout.minor_mask for bit_loc in bit_locs]
+
+# Returns True if the keys of the input dict are exactly the bit indices 0 .. (num_bits-1).
+# Dict keys are unique and bit indices are non-negative, so checking the number of keys and
+# their bounds is equivalent to comparing against the full set of expected indices.
+def has_all_bit_indices(
+  bit_dict: dict[int, int],
+  num_bits: int
+) -> bool:
+  return (len(bit_dict) == num_bits) and (min(bit_dict) == 0) and (max(bit_dict) == num_bits - 1)
+
 # Find min Y index as we need to offset our numbers by this minimal value when storing the column's encoding.
 def find_base_Y(
   bit_locs: list[BitLoc]
@@ -79,7 +96,7 @@ def find_base_Y(
 
 def get_BramMemLoc_encoding(
   bit_locs: list[BramMemLoc],
-  ar_spec: ArchSpec
+  minors: list[int]
 ) -> dict[str, typing.Any]:
   # We want the resulting dictionary to look like this:
   #
@@ -126,11 +143,9 @@ def get_BramMemLoc_encoding(
     )
   )
 
-  for bit_loc in bit_locs:
-    far = FrameAddressRegister.from_int(bit_loc.frame_addr, ar_spec)
+  for (bit_loc, minor) in zip(bit_locs, minors):
     y = bit_loc.block_y - y_min
     memBit = bit_loc.mem_bit
-    minor = far.minor_addr
     frame_ofst = bit_loc.frame_ofst
     tmp["Y_ofst"][y]["minor"][memBit] = minor
     tmp["Y_ofst"][y]["frame_ofst"][memBit] = frame_ofst
@@ -142,10 +157,7 @@ def get_BramMemLoc_encoding(
   for (yOfstKey, yIdx_dict) in tmp.items():
     for (yIdx, minorOrFrameOfst_dict) in yIdx_dict.items():
       for (minorOrFrameOfstKey, memBit_dict) in minorOrFrameOfst_dict.items():
-        bit_indices = set(memBit_dict.keys())
-        expected_indices = set(range(0, bram_mem_size_bits))
-        bit_indices_missing = expected_indices.difference(bit_indices)
-        assert len(bit_indices_missing) == 0, f"Error: Expected to find encoding of all bits (0-{bram_mem_size_bits-1}), but BRAM at Y ofst {yIdx} is missing definitions for bits {sorted(bit_indices_missing)}!"
+        assert has_all_bit_indices(memBit_dict, bram_mem_size_bits), f"Error: Expected to find encoding of all bits (0-{bram_mem_size_bits-1}), but BRAM at Y ofst {yIdx} is missing definitions for bits {sorted(set(range(0, bram_mem_size_bits)).difference(memBit_dict.keys()))}!"
 
   # Now that we have collected a dict-level view of a BRAM's bits, we transform it into an
   # array-level view since we are sure that the keys are 0-(bram_mem_size_bits-1). The key
@@ -170,7 +182,7 @@ def get_BramMemLoc_encoding(
 
 def get_BramMemParityLoc_encoding(
   bit_locs: list[BramMemParityLoc],
-  ar_spec: ArchSpec
+  minors: list[int]
 ) -> dict[str, typing.Any]:
   # We want the resulting dictionary to look like this:
   #
@@ -217,11 +229,9 @@ def get_BramMemParityLoc_encoding(
     )
   )
 
-  for bit_loc in bit_locs:
-    far = FrameAddressRegister.from_int(bit_loc.frame_addr, ar_spec)
+  for (bit_loc, minor) in zip(bit_locs, minors):
     y = bit_loc.block_y - y_min
     parBit = bit_loc.par_bit
-    minor = far.minor_addr
     frame_ofst = bit_loc.frame_ofst
     tmp["Y_ofst"][y]["minor"][parBit] = minor
     tmp["Y_ofst"][y]["frame_ofst"][parBit] = frame_ofst
@@ -233,10 +243,7 @@ def get_BramMemParityLoc_encoding(
   for (yOfstKey, yIdx_dict) in tmp.items():
     for (yIdx, minorOrFrameOfst_dict) in yIdx_dict.items():
       for (minorOrFrameOfstKey, memBit_dict) in minorOrFrameOfst_dict.items():
-        bit_indices = set(memBit_dict.keys())
-        expected_indices = set(range(0, bram_parity_size_bits))
-        bit_indices_missing = expected_indices.difference(bit_indices)
-        assert len(bit_indices_missing) == 0, f"Error: Expected to find encoding of all bits (0-{bram_parity_size_bits-1}), but BRAM at Y ofst {yIdx} is missing definitions for bits {sorted(bit_indices_missing)}!"
+        assert has_all_bit_indices(memBit_dict, bram_parity_size_bits), f"Error: Expected to find encoding of all bits (0-{bram_parity_size_bits-1}), but BRAM at Y ofst {yIdx} is missing definitions for bits {sorted(set(range(0, bram_parity_size_bits)).difference(memBit_dict.keys()))}!"
 
   # Now that we have collected a dict-level view of a BRAM's bits, we transform it into an
   # array-level view since we are sure that the keys are 0-(bram_parity_size_bits-1). The key
@@ -261,7 +268,7 @@ def get_BramMemParityLoc_encoding(
 
 def get_BramRegLoc_encoding(
   bit_locs: list[BramRegLoc],
-  ar_spec: ArchSpec
+  minors: list[int]
 ) -> dict[str, typing.Any]:
   # We want the resulting dictionary to look like this:
   #
@@ -282,7 +289,7 @@ def get_BramRegLoc_encoding(
 
 def get_LutramLoc_encoding(
   bit_locs: list[LutramLoc],
-  ar_spec: ArchSpec
+  minors: list[int]
 ) -> dict[str, typing.Any]:
   # We want the resulting dictionary to look like this:
   #
@@ -316,92 +323,45 @@ def get_LutramLoc_encoding(
 
   y_min = find_base_Y(bit_locs)
 
-  # We first create a "tmp" dict that maps every lut's bit to its minor and frame offset.
-  #
-  #   "Y_ofst": {
-  #     "0": {
-  #       "minor": {
-  #         "A": { // This letter is derived from the bit_loc's "mem_id" field. We will change it to "A6LUT" later.
-  #           "0": <single_num>,
-  #           "1": <single_num>,
-  #           ...
-  #         },
-  #         ...
-  #       },
-  #       "frame_ofst": {
-  #         "A": {
-  #           "0": <single_num>,
-  #           "1": <single_num>,
-  #           ...
-  #         },
-  #         ...
-  #       }
-  #     },
-  #     ...
-  #   }
+  # The LUT's bits are numbered 0-63, so we directly store every bit's minor and frame
+  # offset at its index in a pre-sized array instead of first collecting a dict-level
+  # view of the LUT's bits and sorting it. Entries are initialized to None so we can
+  # detect bits that have no definition in the logic-location file.
+  num_lut_bits = 64
 
-  tmp = defaultdict(
+  res = defaultdict(
     lambda: defaultdict(
-      lambda: defaultdict(
-        lambda: defaultdict(
-          # This is a 5th level that will not exist in the final result. It maps a bit ofst within
-          # the LUT's equation to a int (minor/frame_ofst).
-          lambda: defaultdict(int)
-        )
-      )
+      lambda: defaultdict(dict)
     )
   )
 
-  for bit_loc in bit_locs:
-    far = FrameAddressRegister.from_int(bit_loc.frame_addr, ar_spec)
+  for (bit_loc, minor) in zip(bit_locs, minors):
     y = bit_loc.block_y - y_min
-    lutName = bit_loc.mem_id
+    # The lutName is simply "[ABCDEFGH]" in the logic location file, but I want
+    # the same name as in Vivado "[ABCDEFGH]6LUT".
+    lutName = f"{bit_loc.mem_id}6LUT"
     lutBit = bit_loc.mem_bit
-    minor = far.minor_addr
     frame_ofst = bit_loc.frame_ofst
-    tmp["Y_ofst"][y]["minor"][lutName][lutBit] = minor
-    tmp["Y_ofst"][y]["frame_ofst"][lutName][lutBit] = frame_ofst
 
-  # Sanity check that all bits of the LUT are present in the tmp dict.
-  for (yOfstKey, yIdx_dict) in tmp.items():
-    for (yIdx, minorOrFrameOfst_dict) in yIdx_dict.items():
-      for (minorOrFrameOfstKey, lutName_dict) in minorOrFrameOfst_dict.items():
-        for (lutName, lutBit_dict) in lutName_dict.items():
-          bit_indices = set(lutBit_dict.keys())
-          expected_indices = set(range(0, 64))
-          bit_indices_missing = expected_indices.difference(bit_indices)
-          assert len(bit_indices_missing) == 0, f"Error: Expected to find encoding of all bits (0-63), but {lutName} at Y ofst {yIdx} is missing definitions for bits {sorted(bit_indices_missing)}!"
-
-  # Now that we have collected a dict-level view of a LUT's bits, we transform it into an
-  # array-level view since we are sure that the keys are 0-63 (we just checked). The key
-  # is therefore redundant and we can use an implicit array index instead.
-
-  res = defaultdict(
-    lambda: defaultdict(
-      lambda: defaultdict(
-        lambda: defaultdict(list)
-      )
-    )
-  )
+    y_dict = res["Y_ofst"][y]
+    if lutName not in y_dict["minor"]:
+      y_dict["minor"][lutName] = [None] * num_lut_bits
+      y_dict["frame_ofst"][lutName] = [None] * num_lut_bits
+    y_dict["minor"][lutName][lutBit] = minor
+    y_dict["frame_ofst"][lutName][lutBit] = frame_ofst
 
-  for (yOfstKey, yIdx_dict) in tmp.items():
+  # Sanity check that all bits of the LUT are present.
+  for (yOfstKey, yIdx_dict) in res.items():
     for (yIdx, minorOrFrameOfst_dict) in yIdx_dict.items():
       for (minorOrFrameOfstKey, lutName_dict) in minorOrFrameOfst_dict.items():
-        for (lutName, lutBit_dict) in lutName_dict.items():
-          # The keys of the dict are the bit indices of the LUT. We sort by the key
-          # to ensure the LUT equation is ordered correctly. We discard the bitIdx
-          # as we are sure it goes from 0 to 63 (we checked earlier).
-          sorted_bit_encoding = [value for (bitIdx, value) in sorted(lutBit_dict.items())]
-          # The lutName is simply "[ABCDEFGH]" in the logic location file, but I want
-          # the same name as in Vivado "[ABCDEFGH]6LUT".
-          lutName_final = f"{lutName}6LUT"
-          res[yOfstKey][yIdx][minorOrFrameOfstKey][lutName_final] = sorted_bit_encoding
+        for (lutName, lut_encoding) in lutName_dict.items():
+          assert None not in lut_encoding, f"Error: Expected to find encoding of all bits (0-{num_lut_bits-1}), but {lutName} at Y ofst {yIdx} is missing definitions for bits {[bitIdx for (bitIdx, value) in enumerate(lut_encoding) if value is None]}!"
 
   return res
 
 def get_RegLoc_encoding(
   bit_locs: list[RegLoc],
-  ar_spec: ArchSpec
+  minors: list[int]
 ) -> dict[str, typing.Any]:
   # We want the resulting dictionary to look like this:
   #
@@ -451,17 +411,29 @@ def get_RegLoc_encoding(
     )
   )
 
-  for bit_loc in bit_locs:
-    far = FrameAddressRegister.from_int(bit_loc.frame_addr, ar_spec)
+  for (bit_loc, minor) in zip(bit_locs, minors):
     y = bit_loc.block_y - y_min
     regName = bit_loc.reg
-    minor = far.minor_addr
     frame_ofst = bit_loc.frame_ofst
     res["Y_ofst"][y]["minor"][regName] = minor
     res["Y_ofst"][y]["frame_ofst"][regName] = frame_ofst
 
   return res
 
+# Maps every type of logic location to the key under which its encoding is stored
+# in the final dict and to the function that extracts the encoding.
+bitLocType_key_encoder: dict[str, tuple[str, typing.Callable]] = {
+  "BramMemLoc": ("BramMemLoc", get_BramMemLoc_encoding),
+  "BramMemParityLoc": ("BramMemParityLoc", get_BramMemParityLoc_encoding),
+  "BramRegLoc": ("BramRegLoc", get_BramRegLoc_encoding),
+  # NOTE: Should technically use "LutramLoc" as the key here, but I do not want to differentiate between LUTs and LUTRAMs
+  # in the architecture summary files (the INIT bits we were interested in ended up having the same encoding for LUTRAMs
+  # and standard LUTs when we extracted the data).
+  "LutramLoc": ("LutLoc", get_LutramLoc_encoding),
+  "LutLoc": ("LutLoc", get_LutramLoc_encoding),
+  "RegLoc": ("RegLoc", get_RegLoc_encoding)
+}
+
 def get_encoding(
   logic_locs: LogicLocationFile,
   ar_spec: ArchSpec,
@@ -469,10 +441,23 @@ def get_encoding(
 ) -> dict[str, typing.Any]:
   # We first split the logic locations by their type as we will put each type under
   # a different key in the final dict.
+  #
+  # There are only a handful of logic location classes, but potentially millions of
+  # logic locations. We therefore cache the class name (or None if the class does not
+  # match the filter) per class so every logic location only costs a dict lookup.
+  bitLocClass_name_cache: dict[type, str | None] = dict()
   bitLocType_bitLoc_dict: dict[str, list[BitLoc]] = defaultdict(list)
   for bit_loc in logic_locs.bit_locs:
-    bit_loc_class_name = bit_loc.__class__.__name__
-    if re.match(filter_regex, bit_loc_class_name):
+    bit_loc_class = type(bit_loc)
+    if bit_loc_class in bitLocClass_name_cache:
+      bit_loc_class_name = bitLocClass_name_cache[bit_loc_class]
+    else:
+      bit_loc_class_name = bit_loc_class.__name__
+      if re.match(filter_regex, bit_loc_class_name) is None:
+        bit_loc_class_name = None
+      bitLocClass_name_cache[bit_loc_class] = bit_loc_class_name
+
+    if bit_loc_class_name is not None:
       bitLocType_bitLoc_dict[bit_loc_class_name].append(bit_loc)
 
   # Display number of entries per type.
@@ -501,24 +486,20 @@ def get_encoding(
 
   res = dict()
   for (bitLocType, bit_locs) in bitLocType_bitLoc_dict.items():
+    assert bitLocType in bitLocType_key_encoder, f"Error: Unknown type {bitLocType}"
+    (key, encoder) = bitLocType_key_encoder[bitLocType]
+
+    # NOTE: get_BramRegLoc_encoding() ignores its inputs (BRAM register encodings are not
+    # extracted), so the (potentially large) FAR validation pass and minor computation
+    # are skipped for its bit locations.
+    if bitLocType == "BramRegLoc":
+      res[key] = encoder(bit_locs, list())
+      continue
+
     assert fars_are_valid_for_encoding_extraction(bit_locs, ar_spec), f"Error: The SLR numbers and major row/col addresses are not constant for entries of type {bitLocType} in the logic-location file!"
 
-    bit_loc = bit_locs[0]
-    if bitLocType == "BramMemLoc":
-      res[bitLocType] = get_BramMemLoc_encoding(bit_locs, ar_spec)
-    elif bitLocType == "BramMemParityLoc":
-      res[bitLocType] = get_BramMemParityLoc_encoding(bit_locs, ar_spec)
-    elif bitLocType == "BramRegLoc":
-      res[bitLocType] = get_BramRegLoc_encoding(bit_locs, ar_spec)
-    elif (bitLocType == "LutramLoc") or (bitLocType == "LutLoc"):
-      # NOTE: Should technically use bitLocType here, but I do not want to differentiate between LUTs and LUTRAMs in the
-      # architecture summary files (the INIT bits we were interested in ended up having the same encoding for LUTRAMs
-      # and standard LUTs when we extracted the data).
-      res["LutLoc"] = get_LutramLoc_encoding(bit_locs, ar_spec)
-    elif bitLocType == "RegLoc":
-      res[bitLocType] = get_RegLoc_encoding(bit_locs, ar_spec)
-    else:
-      assert False, f"Error: Unknown type {bitLocType}"
+    minors = get_minor_addrs(bit_locs, ar_spec)
+    res[key] = encoder(bit_locs, minors)
 
   return res
 
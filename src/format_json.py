@@ -12,6 +12,8 @@ import typing
 # version of python3 embedded within it. Using custom libraries will result in
 # an error being generated.
 
+_DIGITS_PATTERN = re.compile(r"(\d+)")
+
 # Used to perform a rudimentary version of "natural" sorting so strings that contain
 # numbers can be compared correctly. This function takes an input string and converts
 # it to a tuple of strings/numbers.
@@ -36,15 +38,10 @@ def key_to_tup(k: str) -> typing.Tuple:
   #   Split string by the occurrences of pattern.
   #   If capturing parentheses are used in pattern, then the text of all groups in the pattern
   #   are also returned as part of the resulting list.
-  parts = re.split(r"(\d+)", k)
+  parts = _DIGITS_PATTERN.split(k)
   parts = [try_int(part) for part in parts]
   return tuple(parts)
 
-def indent(x: str, amount: int = 2) -> str:
-  lines = x.splitlines()
-  lines_indented = [" " * amount + line for line in lines]
-  return "\n".join(lines_indented)
-
 def is_dict(x: typing.Any) -> bool:
   return isinstance(x, dict)
 
@@ -59,7 +56,8 @@ def is_num(x: typing.Any) -> bool:
 
 def emit_dict(
   d: typing.Dict[typing.Any, typing.Any],
-  sort_keys: bool = False
+  sort_keys: bool = False,
+  indent_str: str = ""
 ) -> str:
   def is_nested(d: typing.Dict[typing.Any, typing.Any]) -> bool:
     for (k, v) in d.items():
@@ -79,26 +77,29 @@ def emit_dict(
   else:
     d_ord = d.items()
 
-  content_lines: typing.List[str] = list()
-  for (k, v) in d_ord:
-    sub_str = f"\"{k}\": {emit(v, sort_keys)}"
-    if nested:
-      content_lines.append(indent(sub_str))
-    else:
-      content_lines.append(sub_str)
-
   if nested:
-    content_str = ",\n".join(content_lines)
-    d_str = f"{{\n{content_str}\n}}"
+    # Children are emitted directly at their final indentation level. This avoids
+    # re-indenting the (potentially huge) string of every child once per nesting
+    # level above it.
+    child_indent_str = indent_str + "  "
+    content_str = ",\n".join([
+      f"{child_indent_str}\"{k}\": {emit(v, sort_keys, child_indent_str)}"
+      for (k, v) in d_ord
+    ])
+    d_str = f"{{\n{content_str}\n{indent_str}}}"
   else:
-    content_str = ",".join(content_lines)
+    content_str = ",".join([
+      f"\"{k}\": {emit(v, sort_keys)}"
+      for (k, v) in d_ord
+    ])
     d_str = f"{{{content_str}}}"
 
   return d_str
 
 def emit_list(
   l: typing.List[typing.Any],
-  sort_keys: bool = False
+  sort_keys: bool = False,
+  indent_str: str = ""
 ) -> str:
   def is_nested(l: typing.List[typing.Any]) -> bool:
     for v in l:
@@ -108,21 +109,17 @@ def emit_list(
 
   nested = is_nested(l)
 
-  content_lines: typing.List[str] = list()
-  for v in l:
-    sub_str = emit(v, sort_keys)
-    if nested:
-      content_lines.append(indent(sub_str))
-    else:
-      content_lines.append(sub_str)
-
   if nested:
     # Nested arrays are emitted over multiple lines.
-    content_str = ",\n".join(content_lines)
-    l_str = f"[\n{content_str}\n]"
+    child_indent_str = indent_str + "  "
+    content_str = ",\n".join([
+      f"{child_indent_str}{emit(v, sort_keys, child_indent_str)}"
+      for v in l
+    ])
+    l_str = f"[\n{content_str}\n{indent_str}]"
   else:
     # Leaf arrays are emitted over a single line.
-    content_str = ",".join(content_lines)
+    content_str = ",".join([emit(v, sort_keys) for v in l])
     l_str = f"[{content_str}]"
 
   return l_str
@@ -138,14 +135,18 @@ def emit_num(
 ) -> str:
   return f"{n}"
 
+# The indent_str is the indentation of the line on which the emitted object
+# starts. It is used to indent the lines of nested objects and is not prepended
+# to the first line of the result (the caller is responsible for it).
 def emit(
   x: typing.Any,
-  sort_keys: bool = False
+  sort_keys: bool = False,
+  indent_str: str = ""
 ) -> str:
   if is_dict(x):
-    res = emit_dict(x, sort_keys)
+    res = emit_dict(x, sort_keys, indent_str)
   elif is_list(x):
-    res = emit_list(x, sort_keys)
+    res = emit_list(x, sort_keys, indent_str)
   elif is_str(x):
     res = emit_str(x)
   elif is_num(x):
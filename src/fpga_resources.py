@@ -16,13 +16,28 @@ class LutInput(enum.IntEnum):
   I4 = 4
   I5 = 5
 
+# Mask of the truth table indices at which input IX is 0 (one mask per LUT input).
+# Ex: I0 is 0 at every even index, hence 0x5555555555555555 for I0.
+_lut_input_zero_masks = [
+  0x5555555555555555, # I0
+  0x3333333333333333, # I1
+  0x0F0F0F0F0F0F0F0F, # I2
+  0x00FF00FF00FF00FF, # I3
+  0x0000FFFF0000FFFF, # I4
+  0x00000000FFFFFFFF  # I5
+]
+
 class Lut:
+  __slots__ = ("_init", "_inputs")
+
   def __init__(
     self,
     # A single long 64-bit binary number with MSb on the left and LSb on the right.
     init_bin: str = None
   ) -> None:
-    self._init = np.zeros(fpgares_spec.LEN_LUT_BITS // 8, dtype=np.uint8)
+    # The truth table has 64 entries, so we store it as a single python int in which bit i is
+    # the output of the LUT for truth table index i. Reading an entry is then a shift and a mask.
+    self._init = 0
     # The binary number "<I5><I4><I3><I2><I1><I0>" is the index into the truth table.
     self._inputs = [
       LutInput.I5,
@@ -38,22 +53,14 @@ class Lut:
       assert helpers.is_binary_str(init_bin), f"Error: lut initialization vector is not binary-valued"
 
       # INIT values are written in human readable binary form. Bit 0 is on the right, and bit 63 is
-      # on the left. Storing the INIT values as-is would require us to access index 63 to read
-      # the value of bit 0. We reverse the value to get around this issue.
-      for idx in range(fpgares_spec.LEN_LUT_BITS):
-        idx_rev = fpgares_spec.LEN_LUT_BITS - 1 - idx
-        bit_value = int(init_bin[idx_rev])
-        helpers.np_write_bit(self._init, idx, bit_value)
+      # on the left, which is exactly how python parses binary numbers.
+      self._init = int(init_bin, 2)
 
   def to_bin(self) -> str:
-    words_bin_str = [f"{word:0>8b}" for word in self._init]
-    # We reverse so we can put the most significant word on the left.
-    return "".join(reversed(words_bin_str))
+    return f"{self._init:0>{fpgares_spec.LEN_LUT_BITS}b}"
 
   def to_hex(self) -> str:
-    words_hex_str = [f"{word:0>2x}" for word in self._init]
-    # We reverse so we can put the most significant word on the left.
-    return "".join(reversed(words_hex_str))
+    return f"{self._init:0>{fpgares_spec.LEN_LUT_BITS // 4}x}"
 
   def set_bit(
     self,
@@ -61,14 +68,15 @@ class Lut:
     value: int
   ) -> None:
     assert 0 <= idx < fpgares_spec.LEN_LUT_BITS, f"Error: Invalid index {idx}"
-    helpers.np_write_bit(self._init, idx, value)
+    assert helpers.is_binary_int(value), f"Error: Expected 0/1 (received {value})"
+    self._init = (self._init & ~(1 << idx)) | (int(value) << idx)
 
   def get_bit(
     self,
     idx: int
   ) -> int:
     assert 0 <= idx < fpgares_spec.LEN_LUT_BITS, f"Error: Invalid index {idx}"
-    return helpers.np_read_bit(self._init, idx)
+    return (self._init >> idx) & 1
 
   def compute_output(
     self,
@@ -79,43 +87,26 @@ class Lut:
     I4: bool,
     I5: bool
   ) -> bool:
-    # "tf" is True/False
-    idx = sum([tf * 2**i for (i, tf) in zip([5, 4, 3, 2, 1, 0], [I5, I4, I3, I2, I1, I0])])
-    return bool(self.get_bit(idx))
+    idx = (I5 << 5) | (I4 << 4) | (I3 << 3) | (I2 << 2) | (I1 << 1) | I0
+    return bool((self._init >> idx) & 1)
 
   def is_input_unused(
     self,
     lut_input: LutInput
   ) -> bool:
-    num_inputs = len(LutInput)
     lut_input_idx: int = lut_input.value
 
     # To test whether an input IX is unused, we compare the output of the truth table
     # when IX is 0/1 for all combinations of the *other* inputs. If there is no combination
     # of inputs whose output changes when toggling IX from 0/1, the input is independent.
-
-    for other_inputs_int in range(2 ** (num_inputs-1)):
-      # When reading a binary number the MSb is on the left and the LSb on the right. Accessing
-      # element 0 of the string will result in returning the MSb instead of the LSb, so I reverse
-      # the string such that element 0 corresponds to the LSb when indexing.
-      other_inputs_bin = f"{other_inputs_int:0>{num_inputs-1}b}"[::-1]
-
-      # We compute the index of the truth table entries to check by slicing the binary string and
-      # inserting a 0/1 at position {lut_input_idx}. We then reverse the binary string so that we
-      # can transform it back to an integer form.
-      res_0_idx_bin = f"{other_inputs_bin[:lut_input_idx]}0{other_inputs_bin[lut_input_idx:]}"[::-1]
-      res_1_idx_bin = f"{other_inputs_bin[:lut_input_idx]}1{other_inputs_bin[lut_input_idx:]}"[::-1]
-      res_0_idx_int = int(res_0_idx_bin, 2)
-      res_1_idx_int = int(res_1_idx_bin, 2)
-
-      # Check if the output of the function changes when IX is 0/1. If yes, the input is used.
-      res_0 = self.get_bit(res_0_idx_int)
-      res_1 = self.get_bit(res_1_idx_int)
-
-      if res_0 != res_1:
-        return False
-
-    return True
+    #
+    # Toggling IX from 0 to 1 adds 2**X to the truth table index. Shifting the truth table
+    # right by 2**X therefore aligns every entry where IX=1 with its IX=0 counterpart, and
+    # XOR-ing with the original truth table flags the entries that differ. We only look at
+    # the truth table indices where IX=0 (selected by the mask).
+    ofst = 1 << lut_input_idx
+    diff = (self._init >> ofst) ^ self._init
+    return (diff & _lut_input_zero_masks[lut_input_idx]) == 0
 
   def get_unused_inputs(
     self
@@ -131,6 +122,8 @@ class Bram:
   # The initialization values must be BIN instead of HEX simply because some entries are not multiples of 4 in length
   # (the register initial values are 18 bits for example). I have since dropped support for register initial values, but
   # I kept the input in binary in any case.
+  __slots__ = ("init_mem", "init_parity")
+
   def __init__(
     self,
     # A single long 16384-bit binary number with MSb on the left and LSb on the right.
@@ -150,19 +143,13 @@ class Bram:
       assert len(init_mem_bin) == fpgares_spec.LEN_BRAM_MEMORY_BITS, f"Error: Expected {fpgares_spec.LEN_BRAM_MEMORY_BITS}-bit string as bram content initial value (received input of length {len(init_mem_bin)})"
       assert helpers.is_binary_str(init_mem_bin), f"Error: bram content initialization vector is not binary-valued"
 
-      for idx in range(fpgares_spec.LEN_BRAM_MEMORY_BITS):
-        idx_rev = fpgares_spec.LEN_BRAM_MEMORY_BITS - 1 - idx
-        bit_value = int(init_mem_bin[idx_rev])
-        helpers.np_write_bit(self.init_mem, idx, bit_value)
+      self.init_mem = helpers.np_from_bin_str(init_mem_bin)
 
     if init_parity_bin is not None:
       assert len(init_parity_bin) == fpgares_spec.LEN_BRAM_PARITY_BITS, f"Error: Expected {fpgares_spec.LEN_BRAM_PARITY_BITS}-bit string as bram parity initial value (received input of length {len(init_parity_bin)})"
       assert helpers.is_binary_str(init_parity_bin), f"Error: bram parity initialization vector is not binary-valued"
 
-      for idx in range(fpgares_spec.LEN_BRAM_PARITY_BITS):
-        idx_rev = fpgares_spec.LEN_BRAM_PARITY_BITS - 1 - idx
-        bit_value = int(init_parity_bin[idx_rev])
-        helpers.np_write_bit(self.init_parity, idx, bit_value)
+      self.init_parity = helpers.np_from_bin_str(init_parity_bin)
 
   def set_mem_bit(
     self,
@@ -180,6 +167,24 @@ class Bram:
     assert 0 <= idx < fpgares_spec.LEN_BRAM_PARITY_BITS, f"Error: Invalid index {idx}"
     helpers.np_write_bit(self.init_parity, idx, value)
 
+  # Vectorized version of set_mem_bit().
+  def set_mem_bits(
+    self,
+    idxs: np.ndarray,
+    values: np.ndarray
+  ) -> None:
+    assert np.all((0 <= idxs) & (idxs < fpgares_spec.LEN_BRAM_MEMORY_BITS)), f"Error: Invalid indices"
+    helpers.np_write_bits(self.init_mem, idxs, values)
+
+  # Vectorized version of set_parity_bit().
+  def set_parity_bits(
+    self,
+    idxs: np.ndarray,
+    values: np.ndarray
+  ) -> None:
+    assert np.all((0 <= idxs) & (idxs < fpgares_spec.LEN_BRAM_PARITY_BITS)), f"Error: Invalid indices"
+    helpers.np_write_bits(self.init_parity, idxs, values)
+
   def get_mem_bit(
     self,
     idx: int
@@ -195,21 +200,13 @@ class Bram:
     return helpers.np_read_bit(self.init_parity, idx)
 
   def mem_to_bin(self) -> str:
-    words_bin_str = [f"{word:0>8b}" for word in self.init_mem]
-    # We reverse so we can put the most significant word on the left.
-    return "".join(reversed(words_bin_str))
+    return helpers.np_to_bin_str(self.init_mem)
 
   def parity_to_bin(self) -> str:
-    words_bin_str = [f"{word:0>8b}" for word in self.init_parity]
-    # We reverse so we can put the most significant word on the left.
-    return "".join(reversed(words_bin_str))
+    return helpers.np_to_bin_str(self.init_parity)
 
   def mem_to_hex(self) -> str:
-    words_hex_str = [f"{word:0>2x}" for word in self.init_mem]
-    # We reverse so we can put the most significant word on the left.
-    return "".join(reversed(words_hex_str))
+    return helpers.np_to_hex_str(self.init_mem)
 
   def parity_to_hex(self) -> str:
-    words_hex_str = [f"{word:0>2x}" for word in self.init_parity]
-    # We reverse so we can put the most significant word on the left.
-    return "".join(reversed(words_hex_str))
+    return helpers.np_to_hex_str(self.init_parity)
@@ -5,13 +5,15 @@ from collections import defaultdict
 import numpy as np
 
 import bitstream_spec as bit_spec
-import helpers
+import frame_fast
 import resources
 from arch_spec import ArchSpec
 from frame_spec import FarBlockType
 
 
 class FrameAddressRegister:
+  __slots__ = ("spec", "reserved", "block_type", "row_addr", "col_addr", "minor_addr", "_packed_int", "_key", "_hex")
+
   def __init__(
     self,
     reserved: int,
@@ -28,43 +30,44 @@ class FrameAddressRegister:
     self.col_addr = col_addr
     self.minor_addr = minor_addr
 
+    # Every field is shifted to its bit position in the register. This avoids going
+    # through a binary string representation of the register.
+    layout = spec.far_layout
+    self._packed_int = \
+      (reserved << layout.reserved_shift) | \
+      (block_type.value << layout.block_type_shift) | \
+      (row_addr << layout.row_shift) | \
+      (col_addr << layout.col_shift) | \
+      (minor_addr << layout.minor_shift)
+
+    # FARs are used as dict keys in many places, so the key used for hashing and
+    # equality is computed once here. The spec's class is used instead of the spec
+    # itself as different bitstreams of the same architecture each create their own
+    # spec object, but their FARs must compare equal.
+    self._key = (spec.__class__, self._packed_int)
+
+    # The same FARs are printed over and over when dumping results, so the hex
+    # representation is computed on first use and kept.
+    self._hex: str | None = None
+
+  def to_int(self) -> int:
+    return self._packed_int
+
   def to_bin(self) -> str:
-    # Compute binary representation of every field with their actual bitwidth.
-    # Python's f-strings allow using a custom width in the format.
-    b_reserved = f"{self.reserved:0>{self.spec.far_reserved_width()}b}"
-    b_block_type = f"{self.block_type.value:0>{self.spec.far_block_type_width()}b}"
-    b_row_addr = f"{self.row_addr:0>{self.spec.far_row_address_width()}b}"
-    b_col_addr = f"{self.col_addr:0>{self.spec.far_column_address_width()}b}"
-    b_minor_addr = f"{self.minor_addr:0>{self.spec.far_minor_address_width()}b}"
-
-    b_far = f"{b_reserved}{b_block_type}{b_row_addr}{b_col_addr}{b_minor_addr}"
+    # The reserved field holds the most significant bits of the register.
+    b_far = f"{self.to_int():0>{self.spec.far_layout.width}b}"
     return b_far
 
   def to_hex(self) -> str:
-    b_far = self.to_bin()
-    h_far = f"{int(b_far, 2):0>8x}"
-    return h_far
-
-  def to_int(self) -> int:
-    b_far = self.to_bin()
-    i_far = int(b_far, 2)
-    return i_far
+    if self._hex is None:
+      self._hex = f"{self.to_int():0>8x}"
+    return self._hex
 
   def __hash__(self) -> int:
-    return hash((
-      self.__class__,
-      self.spec,
-      self.reserved,
-      self.block_type,
-      self.row_addr,
-      self.col_addr,
-      self.minor_addr
-    ))
+    return hash(self._key)
 
   def __eq__(self, other) -> bool:
-    self_keys = (self.reserved, self.block_type, self.row_addr, self.col_addr, self.minor_addr)
-    other_keys = (other.reserved, other.block_type, other.row_addr, other.col_addr, other.minor_addr)
-    return self_keys == other_keys
+    return self._key == other._key
 
   @staticmethod
   def from_int(
@@ -74,11 +77,12 @@ class FrameAddressRegister:
     # Sanity-check to ensure that FAR is an int as some types like numpy int64 look like it, but create
     # problems for serialization to JSON in other places in the code.
     far = int(far)
-    reserved = helpers.bits(far, spec.far_reserved_idx_high(), spec.far_reserved_idx_low())
-    block_type = FarBlockType(helpers.bits(far, spec.far_block_type_idx_high(), spec.far_block_type_idx_low()))
-    row_addr = helpers.bits(far, spec.far_row_address_idx_high(), spec.far_row_address_idx_low())
-    col_addr = helpers.bits(far, spec.far_column_address_idx_high(), spec.far_column_address_idx_low())
-    minor_addr = helpers.bits(far, spec.far_minor_address_idx_high(), spec.far_minor_address_idx_low())
+    layout = spec.far_layout
+    reserved = (far >> layout.reserved_shift) & layout.reserved_mask
+    block_type = FarBlockType((far >> layout.block_type_shift) & layout.block_type_mask)
+    row_addr = (far >> layout.row_shift) & layout.row_mask
+    col_addr = (far >> layout.col_shift) & layout.col_mask
+    minor_addr = (far >> layout.minor_shift) & layout.minor_mask
     return FrameAddressRegister(reserved, block_type, row_addr, col_addr, minor_addr, spec)
 
   def __str__(self) -> str:
@@ -91,6 +95,17 @@ class FrameAddressIncrementer:
   ) -> None:
     device_summary = resources.get_device_summary(fpga_part)
 
+    # Bit position and mask of every FAR field. Used to unpack/pack FARs that are
+    # represented as ints when iterating over many frames.
+    layout = ArchSpec.create_spec(fpga_part).far_layout
+    self.far_fields_lowIdx_mask: list[tuple[int, int]] = [
+      (layout.reserved_shift, layout.reserved_mask),
+      (layout.block_type_shift, layout.block_type_mask),
+      (layout.row_shift, layout.row_mask),
+      (layout.col_shift, layout.col_mask),
+      (layout.minor_shift, layout.minor_mask)
+    ]
+
     # I want a dict like:
     #
     #   {
@@ -129,6 +144,43 @@ class FrameAddressIncrementer:
         self.num_minors_per_std_colMajor[idcode][rowMajor] = device_summary.get_num_minors_per_std_col_major(slrName, rowMajor)
         self.num_minors_per_bram_colMajor[idcode][rowMajor] = device_summary.get_num_minors_per_bram_content_col_major(slrName, rowMajor)
 
+    # Same information as above, but stored in numpy arrays for the kernels of frame_fast.
+    #
+    #   {
+    #     <idcode>: (
+    #       num_minors_std,     // 2D array: [rowMajor][colMajor] -> num minors (zero-padded)
+    #       num_colMajors_std,  // 1D array: [rowMajor] -> num col majors
+    #       num_minors_bram,    // 2D array: [rowMajor][colMajor] -> num minors (zero-padded)
+    #       num_colMajors_bram  // 1D array: [rowMajor] -> num col majors
+    #     )
+    #   }
+    def to_np_arrays(
+      rowMajor_numMinors: dict[int, list[int]]
+    ) -> tuple[np.ndarray, np.ndarray]:
+      num_rows = max(rowMajor_numMinors) + 1
+      num_colMajors = np.zeros(num_rows, dtype=np.int64)
+      for (rowMajor, numMinors) in rowMajor_numMinors.items():
+        num_colMajors[rowMajor] = len(numMinors)
+
+      num_minors = np.zeros((num_rows, max(num_colMajors)), dtype=np.int64)
+      for (rowMajor, numMinors) in rowMajor_numMinors.items():
+        num_minors[rowMajor, :len(numMinors)] = numMinors
+
+      return (num_minors, num_colMajors)
+
+    self.np_num_minors_per_colMajor: dict[
+      int, # IDCODE
+      tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+    ] = {
+      idcode: (
+        *to_np_arrays(self.num_minors_per_std_colMajor[idcode]),
+        *to_np_arrays(self.num_minors_per_bram_colMajor[idcode])
+      )
+      for idcode in self.num_minors_per_std_colMajor
+    }
+    self.np_far_lows = np.array([low for (low, _) in self.far_fields_lowIdx_mask], dtype=np.int64)
+    self.np_far_masks = np.array([mask for (_, mask) in self.far_fields_lowIdx_mask], dtype=np.int64)
+
   def get_colMajors_numMinors_count(
     self,
     idcode: int,
@@ -204,8 +256,30 @@ class FrameAddressIncrementer:
 
     return is_last_col and is_last_minor
 
+  # Returns the FARs (as ints) of <num_fars> consecutive frames starting at <far>,
+  # and whether each of them is the last FAR of its row. The walk is performed by
+  # a numba-compiled kernel if numba is available.
+  def increment_many(
+    self,
+    idcode: int,
+    far: int,
+    num_fars: int
+  ) -> tuple[
+    np.ndarray, # FARs
+    np.ndarray  # is last FAR of row
+  ]:
+    (num_minors_std, num_colMajors_std, num_minors_bram, num_colMajors_bram) = self.np_num_minors_per_colMajor[idcode]
+    return frame_fast.increment_many(
+      int(far), num_fars,
+      self.np_far_lows, self.np_far_masks,
+      num_minors_std, num_colMajors_std,
+      num_minors_bram, num_colMajors_bram
+    )
+
 # Represents a single configuration frame.
 class ConfigFrame:
+  __slots__ = ("byte_ofst", "words", "far", "spec", "_bits")
+
   def __init__(
     self,
     # Byte ofst in the bitstream at which this configuration frame is found.
@@ -220,6 +294,7 @@ class ConfigFrame:
     self.words = words
     self.far = far
     self.spec = spec
+    self._bits: np.ndarray | None = None
 
   def __str__(self) -> str:
     words_str = [
@@ -228,36 +303,43 @@ class ConfigFrame:
     ]
     return f"BYTE_OFST = 0x{self.byte_ofst:0>8x}, {self.far}, WORDS_HEX = {words_str}"
 
+  # All bits of the frame, indexed by frame bit offset. This is computed once on
+  # first access so repeated bit reads are a simple array lookup.
+  @property
+  def _bits_view(self) -> np.ndarray:
+    if self._bits is None:
+      # The words are big-endian, but we need the bytes of every word in little-endian
+      # order so that unpacking the bytes LSb-first yields bit i of word w at index
+      # (w * num_bits_word + i), which is the bit's offset in the frame.
+      frame_bytes = self.words.astype("<u4").view(np.uint8)
+      self._bits = np.unpackbits(frame_bytes, bitorder="little")
+    return self._bits
+
   def bit(
     self,
     bit_ofst: int
   ) -> int:
-    num_bits_word = self.words.itemsize * 8
-    max_frame_ofst = self.spec.frame_size_words() * num_bits_word
+    max_frame_ofst = self._bits_view.size
     assert 0 <= bit_ofst < max_frame_ofst, f"Error: Expected frame offset to be in range [0 .. {max_frame_ofst}), but received {bit_ofst}"
+    return int(self._bits_view[bit_ofst])
 
-    word_idx = bit_ofst // num_bits_word
-    word_ofst = bit_ofst % num_bits_word
-    target_word = self.words[word_idx]
-    target_bit = helpers.bits(target_word, word_ofst, word_ofst)
-
-    return target_bit
+  # Vectorized version of bit() for reading many bits of the frame at once.
+  def bits(
+    self,
+    bit_ofsts: np.ndarray
+  ) -> np.ndarray:
+    return self._bits_view[bit_ofsts]
 
 # Returns the frame bit offsets that differ between the input frames.
 def diff_frame(
   baseline_frame: ConfigFrame,
   modified_frame: ConfigFrame
 ) -> list[int]:
-  num_bits_word = baseline_frame.words.itemsize * 8
-
-  frame_ofsts = list()
-  for (word_idx, (baseline_word, modified_word)) in enumerate(zip(baseline_frame.words, modified_frame.words)):
-    for bit_ofst_in_word in range(0, num_bits_word):
-      baseline_bit = helpers.bits(baseline_word, bit_ofst_in_word, bit_ofst_in_word)
-      modified_bit = helpers.bits(modified_word, bit_ofst_in_word, bit_ofst_in_word)
-
-      if baseline_bit != modified_bit:
-        bit_ofst_in_frame = word_idx * num_bits_word + bit_ofst_in_word
-        frame_ofsts.append(bit_ofst_in_frame)
-
+  diff_words = np.bitwise_xor(baseline_frame.words, modified_frame.words)
+  # The words are big-endian, but we need the bytes of every word in little-endian
+  # order so that unpacking the bytes LSb-first yields bit i of word w at index
+  # (w * num_bits_word + i), which is the bit's offset in the frame.
+  diff_bytes = diff_words.astype("<u4").view(np.uint8)
+  diff_bits = np.unpackbits(diff_bytes, bitorder="little")
+  frame_ofsts = np.flatnonzero(diff_bits).tolist()
   return frame_ofsts
@@ -0,0 +1,93 @@
+# author: Sahand Kashani <sahand.kashani@epfl.ch>
+
+import numpy as np
+
+from frame_spec import FarBlockType
+
+# Numba is optional. The kernels in this file only use integer arithmetic on numpy
+# arrays so they can be compiled to native code if numba is available. Otherwise
+# they run as regular python functions and produce the same results.
+try:
+  import numba
+  jit = numba.njit(cache=True)
+except ImportError:
+  def jit(f):
+    return f
+
+# Globals are treated as compile-time constants by numba.
+_CLB_IO_CLK = FarBlockType.CLB_IO_CLK.value
+_BRAM_CONTENT = FarBlockType.BRAM_CONTENT.value
+
+# Computes the FARs of <num_fars> consecutive frames starting at <far>. This is the
+# same as calling FrameAddressIncrementer.increment() and is_last_far_of_row()
+# repeatedly, but without any python overhead between frames if numba is available.
+#
+# - far_lows/far_masks: bit position and mask of the (reserved, block type, row, col, minor)
+#   FAR fields.
+# - num_minors_std/num_minors_bram: number of minors in every (row, col major) pair. Rows are
+#   padded with zeros to the largest number of col majors.
+# - num_colMajors_std/num_colMajors_bram: number of col majors in every row.
+#
+# Returns the FARs and whether each FAR is the last one of its row.
+@jit
+def increment_many(
+  far: int,
+  num_fars: int,
+  far_lows: np.ndarray,
+  far_masks: np.ndarray,
+  num_minors_std: np.ndarray,
+  num_colMajors_std: np.ndarray,
+  num_minors_bram: np.ndarray,
+  num_colMajors_bram: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+  fars = np.empty(num_fars, dtype=np.int64)
+  fars_is_last_of_row = np.empty(num_fars, dtype=np.bool_)
+
+  num_rows = num_colMajors_std.shape[0]
+
+  reserved = (far >> far_lows[0]) & far_masks[0]
+  block_type = (far >> far_lows[1]) & far_masks[1]
+  row_addr = (far >> far_lows[2]) & far_masks[2]
+  col_addr = (far >> far_lows[3]) & far_masks[3]
+  minor_addr = (far >> far_lows[4]) & far_masks[4]
+
+  for i in range(num_fars):
+    fars[i] = \
+      (reserved << far_lows[0]) | \
+      (block_type << far_lows[1]) | \
+      (row_addr << far_lows[2]) | \
+      (col_addr << far_lows[3]) | \
+      (minor_addr << far_lows[4])
+
+    if block_type == _CLB_IO_CLK:
+      num_col_majors = num_colMajors_std[row_addr]
+      num_minors_in_col_major = num_minors_std[row_addr, col_addr]
+    elif block_type == _BRAM_CONTENT:
+      num_col_majors = num_colMajors_bram[row_addr]
+      num_minors_in_col_major = num_minors_bram[row_addr, col_addr]
+    else:
+      raise ValueError("Error: Unexpected FAR block type")
+
+    fars_is_last_of_row[i] = (col_addr == num_col_majors - 1) and (minor_addr == num_minors_in_col_major - 1)
+
+    minor_addr += 1
+
+    # Carry over minor to col major.
+    if minor_addr == num_minors_in_col_major:
+      minor_addr = 0
+      col_addr += 1
+
+    # Carry over col major to row major.
+    if col_addr == num_col_majors:
+      col_addr = 0
+      row_addr += 1
+
+    # Carry over row major to block type.
+    if row_addr == num_rows:
+      row_addr = 0
+      if block_type == _CLB_IO_CLK:
+        block_type = _BRAM_CONTENT
+      else:
+        block_type = _CLB_IO_CLK
+
+  return (fars, fars_is_last_of_row)
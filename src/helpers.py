@@ -8,6 +8,13 @@ from pathlib import Path
 
 import numpy as np
 
+# orjson is optional. It decodes the (large) device and architecture summaries
+# much faster than the json module, but the json module is used if it is missing.
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
 
 # Generic helper method to extract a bit slice from an integer.
 def bits(
@@ -34,7 +41,7 @@ def width(
 # Searches a string for a regex pattern. This function expects the search to succeed and throws
 # an error if it is not the case. It avoids repetitive error handling in callers.
 def regex_match(
-  pattern: str,
+  pattern: str | re.Pattern,
   string: str
 ) -> re.Match:
   match = re.search(pattern, string)
@@ -46,8 +53,12 @@ def read_json(
   path: Path
 ) -> dict[str, typing.Any]:
   if path is not None:
-    with open(path, "r") as f:
-      return json.loads(f.read())
+    if orjson is not None:
+      with open(path, "rb") as f:
+        return orjson.loads(f.read())
+    else:
+      with open(path, "r") as f:
+        return json.loads(f.read())
 
   return dict()
 
@@ -131,14 +142,13 @@ def is_binary_int(
 ) -> bool:
   return (value == 0) or (value == 1)
 
+# Compiled once as is_binary_str() is called on every (long) BRAM/LUT initialization string.
+_BINARY_STR_PATTERN = re.compile(r"[01]*")
+
 def is_binary_str(
   value: str
 ) -> bool:
-  for x in value:
-    if not is_binary_int(int(x)):
-      return False
-
-  return True
+  return _BINARY_STR_PATTERN.fullmatch(value) is not None
 
 # Converts numbers from the following "verilog" form:
 #
@@ -220,6 +230,67 @@ def np_read_bit(
   bit = bits(words[word_idx], word_ofst, word_ofst)
   return bit
 
+# Vectorized version of np_write_bit() that writes many bits of a numpy array at once.
+# The bit offsets are expected to be unique.
+def np_write_bits(
+  words: np.ndarray,
+  bit_ofsts: np.ndarray,
+  values: np.ndarray
+) -> None:
+  bit_ofsts = np.asarray(bit_ofsts)
+  values = np.asarray(values)
+  assert bit_ofsts.shape == values.shape, f"Error: Expected as many values as bit offsets (received {values.size} values for {bit_ofsts.size} offsets)"
+  assert np.all((values == 0) | (values == 1)), f"Error: Expected 0/1 values"
+
+  num_bits_word = words.itemsize * 8
+  word_idx = bit_ofsts // num_bits_word
+  word_ofst = (bit_ofsts % num_bits_word).astype(words.dtype)
+
+  # Clear the target bits before setting the ones that must be 1. The unbuffered
+  # ufunc.at() variants are needed as multiple bits can fall in the same word.
+  word_bit_masks = np.left_shift(np.ones_like(word_ofst), word_ofst)
+  np.bitwise_and.at(words, word_idx, np.invert(word_bit_masks))
+  np.bitwise_or.at(words, word_idx, word_bit_masks * values.astype(words.dtype))
+
+# Vectorized version of np_read_bit() that reads many bits of a numpy array at once.
+def np_read_bits(
+  words: np.ndarray,
+  bit_ofsts: np.ndarray
+) -> np.ndarray:
+  bit_ofsts = np.asarray(bit_ofsts)
+  num_bits_word = words.itemsize * 8
+  word_idx = bit_ofsts // num_bits_word
+  word_ofst = (bit_ofsts % num_bits_word).astype(words.dtype)
+  return np.bitwise_and(np.right_shift(words[word_idx], word_ofst), 1)
+
+# Converts a binary string with the MSb on the left and the LSb on the right into a
+# numpy byte array in which bit i of the number is at bit offset i (as read with
+# np_read_bit()). The conversion is done in bulk by numpy instead of bit-by-bit.
+def np_from_bin_str(
+  value: str
+) -> np.ndarray:
+  # Reversing puts the LSb at index 0.
+  bits = np.frombuffer(value.encode("ascii"), dtype=np.uint8)[::-1] - ord("0")
+  return np.packbits(bits, bitorder="little")
+
+# Inverse of np_from_bin_str(). Converts a numpy byte array in which bit i of the
+# number is at bit offset i into a binary string with the MSb on the left and the
+# LSb on the right.
+def np_to_bin_str(
+  bytes_arr: np.ndarray
+) -> str:
+  # Reversing the bytes and unpacking every byte MSb-first puts the MSb of the
+  # number at index 0.
+  bits = np.unpackbits(bytes_arr[::-1], bitorder="big")
+  return (bits + ord("0")).tobytes().decode("ascii")
+
+# Converts a numpy byte array in which bit i of the number is at bit offset i into
+# a hex string with the most significant byte on the left.
+def np_to_hex_str(
+  bytes_arr: np.ndarray
+) -> str:
+  return bytes_arr[::-1].tobytes().hex()
+
 def set_bit(value, bit):
   return value | (1 << bit)
 
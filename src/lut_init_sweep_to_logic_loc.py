@@ -1,20 +1,24 @@
 # author: Sahand Kashani <sahand.kashani@epfl.ch>
 
 import argparse
-import math
+import functools
+import os
 import re
+import tempfile
+import typing
+from collections import defaultdict
 from pathlib import Path
 
 import joblib
-import more_itertools as miter
 import numpy as np
 
+import bitstream_spec as bit_spec
 import frame as fr
 import helpers
 import resources
 from arch_spec import ArchSpec
-from bitstream import Bitstream
-from frame import FrameAddressRegister
+from bitstream import Bitstream, IndividualConfigurationArrays
+from frame import ConfigFrame, FrameAddressRegister
 
 
 def lut_init_sweep_to_logic_loc(
@@ -27,37 +31,43 @@ def lut_init_sweep_to_logic_loc(
   baseline_bit_path = Path(baseline_bitstream)
   baseline_bit = Bitstream.from_file_path(baseline_bit_path)
 
-  input_bit_paths = [
-    p
-    for p in Path(bitstream_dir).glob(f"**/*")
-    if re.search(filter_regex, str(p)) is not None
-  ]
+  input_bit_paths = list(find_files(bitstream_dir, re.compile(filter_regex)))
 
-  lut_encodings = extract_lut_encoding(baseline_bit_path, input_bit_paths, process_cnt)
+  lut_encodings = extract_lut_encoding(baseline_bit, input_bit_paths, process_cnt)
   dump_logic_loc(lut_encodings, baseline_bit.header.fpga_part, out_ll)
 
+# Recursively yields all files under <root_dir> whose path matches <pattern>.
+# Directories are walked with os.scandir() as it returns the entry types along with
+# the names, so no extra stat() or Path object is needed for every entry.
+#
+# Symlinks to directories are NOT followed (the link itself is still matched against
+# <pattern> like any other file). A link back to a parent directory would otherwise
+# recurse forever, and a link to a directory that is also reached directly would yield
+# its bitstreams twice. This matches what Path.glob("**/*") did before the walk used
+# os.scandir().
+def find_files(
+  root_dir: str | Path,
+  pattern: re.Pattern
+) -> typing.Iterator[Path]:
+  with os.scandir(root_dir) as it:
+    for entry in it:
+      if entry.is_dir(follow_symlinks=False):
+        yield from find_files(entry.path, pattern)
+      elif pattern.search(entry.path) is not None:
+        yield Path(entry.path)
+
 def is_power_of_two(n: int):
   return (n != 0) and (n & (n-1) == 0)
 
-def is_one_hot_equation(equation: str) -> bool:
-  equation_int = int(equation, 2)
-  return is_power_of_two(equation_int)
+# Compiled once as every bitstream in the sweep has its file name parsed.
+_LUT_FILENAME_PATTERN = re.compile(r"lut_gen\[(?P<lut_idx>\d+)\]\.lut6_inst_b(?P<lut_equation>[01]{64}).bit.*")
 
 def extract_filename_fields(p: Path) -> tuple[int, str]:
-  pattern = r"lut_gen\[(?P<lut_idx>\d+)\]\.lut6_inst_b(?P<lut_equation>[01]{64}).bit.*"
-  match = helpers.regex_match(pattern, p.name)
+  match = helpers.regex_match(_LUT_FILENAME_PATTERN, p.name)
   lut_idx = int(match.group("lut_idx"))
   lut_equation = match.group("lut_equation")
   return (lut_idx, lut_equation)
 
-def extract_lut_idx_from_filename(p: Path) -> int:
-  (lut_idx, _) = extract_filename_fields(p)
-  return lut_idx
-
-def extract_lut_equation_from_filename(p: Path) -> str:
-  (_, lut_equation) = extract_filename_fields(p)
-  return lut_equation
-
 # Diffs 2 bitstreams.
 #
 # This function expects only a single bit to "logically" differ between the 2 bitstreams.
@@ -66,32 +76,33 @@ def extract_lut_equation_from_filename(p: Path) -> str:
 # In reality multiple "physical" bits will be modified as a result of the single
 # logical bit being different. The reason is that some auxiliary control bits will
 # also be configured depending on the LUT equation used.
+#
+# The baseline is the same for every comparison, so it is parsed once by the caller
+# and only its configuration frames are passed in here.
 def locate_config_difference(
-  baseline_path: Path,
+  baseline: IndividualConfigurationArrays,
   modified_path: Path
 ) -> tuple[
   int, # IDCODE
   list[FrameAddressRegister], # FARs (multiple bits can change, hence why we use a list)
-  list[str] # frame_ofsts (multiple bits can change, hence why we use a list). We use a string so we can encode whether
-            # the bit at the given ofst is active-high or active-low based what we see change in the bitstreams.
+  np.ndarray, # frame_ofsts (multiple bits can change, hence why we use an array)
+  np.ndarray # active-high (True) or active-low (False) status of every frame_ofst based on what we see change in the bitstreams.
 ]:
   # # Debug
-  # print(f"{baseline_path.name} vs {modified_path.name}")
+  # print(f"{modified_path.name}")
 
-  # List of elements that differed between the bitstreams.
-  diff_idcodes: list[int] = list()
+  # List of elements that differed between the bitstreams. All differences must be
+  # in the same IDCODE, so we only keep track of that one IDCODE.
+  sole_idcode: int | None = None
   diff_fars: list[FrameAddressRegister] = list()
-  diff_frameOfsts: list[str] = list()
+  diff_frameOfsts: list[np.ndarray] = list()
+  diff_activeHigh: list[np.ndarray] = list()
 
-  baseline_bitstream = Bitstream.from_file_path(baseline_path)
   modified_bitstream = Bitstream.from_file_path(modified_path)
 
-  baseline_valid = (not baseline_bitstream.is_partial()) and (not baseline_bitstream.is_compressed())
   modified_valid = (not modified_bitstream.is_partial()) and (not modified_bitstream.is_compressed())
-  assert baseline_valid, f"Error: {baseline_path} must be a full uncompressed bitstream!"
   assert modified_valid, f"Error: {modified_path} must be a full uncompressed bitstream!"
 
-  baseline = baseline_bitstream.get_per_far_configuration_arrays()
   modified = modified_bitstream.get_per_far_configuration_arrays()
 
   # Sanity check that the bistreams have the same IDCODEs.
@@ -100,15 +111,18 @@ def locate_config_difference(
   assert baseline_idcodes == modified_idcodes, f"Error: Unequal IDCODEs detected"
 
   for idcode in baseline_idcodes:
-    # Sanity check that the bitstreams have the same FARs.
-    baseline_fars = baseline[idcode].keys()
-    modified_fars = modified[idcode].keys()
-    assert baseline_fars == modified_fars, f"Error: Unequal FARs detected"
-
-    for far in baseline_fars:
+    # Sanity check that the bitstreams have the same FARs. Comparing the key sets
+    # would hash every FAR of both bitstreams. Instead we check that both have the
+    # same number of FARs and that every baseline FAR is found in the modified
+    # bitstream while looking up its frames below, which implies the same.
+    baseline_far_frames = baseline[idcode]
+    modified_far_frames = modified[idcode]
+    assert len(baseline_far_frames) == len(modified_far_frames), f"Error: Unequal FARs detected"
+
+    for (far, baseline_frames) in baseline_far_frames.items():
       # Sanity check that the FAR is written the same number of times.
-      baseline_frames = baseline[idcode][far]
-      modified_frames = modified[idcode][far]
+      modified_frames = modified_far_frames.get(far)
+      assert modified_frames is not None, f"Error: Unequal FARs detected"
       assert len(baseline_frames) == len(modified_frames), f"Error: FARs written unequal number of times"
 
       for (baseline_frame, modified_frame) in zip(baseline_frames, modified_frames):
@@ -117,36 +131,123 @@ def locate_config_difference(
         modified_byteOfst = modified_frame.byte_ofst
         assert baseline_byteOfst == modified_byteOfst, f"Error: Comparing frames at different byte offsets"
 
-        if not np.array_equal(baseline_frame.words, modified_frame.words):
-          frame_ofsts = fr.diff_frame(baseline_frame, modified_frame)
-
-          for frame_ofst in frame_ofsts:
-            baseline_bit_value = baseline_frame.bit(frame_ofst)
-            modified_bit_value = modified_frame.bit(frame_ofst)
-
-            assert baseline_bit_value != modified_bit_value, f"Error: Expected bit values to differ!"
-            if (baseline_bit_value == 0) and (modified_bit_value == 1):
-              frame_ofst_str = f"{frame_ofst}"
-            else:
-              # The ! is to mark that the value is active-low.
-              frame_ofst_str = f"!{frame_ofst}"
+        # Almost all frames are identical. Comparing the raw bytes is a single memcmp
+        # and is much cheaper than np.array_equal() for such small arrays.
+        if baseline_frame.words.tobytes() != modified_frame.words.tobytes():
+          # All differing bits of the frame are located and read at once. Only a handful
+          # of bits differ, so they are read directly from the words instead of unpacking
+          # every bit of the frames.
+          frame_ofsts = np.array(fr.diff_frame(baseline_frame, modified_frame), dtype=np.int64)
+          baseline_bit_values = helpers.np_read_bits(baseline_frame.words, frame_ofsts)
+          modified_bit_values = helpers.np_read_bits(modified_frame.words, frame_ofsts)
+          assert np.all(baseline_bit_values != modified_bit_values), f"Error: Expected bit values to differ!"
+
+          # A bit is active-high if it goes from 0 in the baseline to 1 in the modified
+          # bitstream.
+          frame_ofsts_active_high = (baseline_bit_values == 0) & (modified_bit_values == 1)
+
+          # Sanity check that all IDCODEs are identical (they must be as otherwise changing something in
+          # one column would cause a column in another SLR to change).
+          if sole_idcode is None:
+            sole_idcode = idcode
+          assert sole_idcode == idcode, f"Error: Found multiple different bits in multiple IDCODEs!"
+
+          diff_fars.extend([far] * len(frame_ofsts))
+          diff_frameOfsts.append(frame_ofsts)
+          diff_activeHigh.append(frame_ofsts_active_high)
+
+          # # Debug
+          # print(f"IDCODE = 0x{idcode:0>8x}, {far}, FRAME_OFSTS = {frame_ofsts}, ACTIVE_HIGH = {frame_ofsts_active_high}")
+
+  assert sole_idcode is not None, f"Error: No difference found between the baseline and {modified_path}!"
+
+  # The offsets stay numeric and are only formatted when the logic location file is written.
+  return (
+    sole_idcode,
+    diff_fars,
+    np.concatenate(diff_frameOfsts).astype(np.uint32),
+    np.concatenate(diff_activeHigh)
+  )
 
-            diff_idcodes.append(idcode)
-            diff_fars.append(far)
-            diff_frameOfsts.append(frame_ofst_str)
+# File names of the baseline dump in the directory passed to the workers.
+_BASELINE_WORDS_FILENAME = "baseline_words.npy"
+_BASELINE_INDEX_FILENAME = "baseline_index.joblib"
 
-            # # Debug
-            # print(f"IDCODE = 0x{idcode:0>8x}, {far}, FRAME_OFST = {frame_ofst_str}")
+# Writes the baseline's configuration frames to <dump_dir> so workers can share them.
+#
+# The words of all frames are stacked in a single 2D array (one frame per row) which
+# is saved as a .npy file. A small sidecar index maps every (IDCODE, FAR) to the rows
+# (and byte offsets) of the frames written to it.
+def dump_baseline(
+  baseline_bit: Bitstream,
+  dump_dir: Path
+) -> None:
+  #   idcode -> far_int -> list[row idx]
+  idcode_farInt_rowIdxs: dict[int, dict[int, list[int]]] = dict()
+  frames_words: list[np.ndarray] = list()
+  frames_byteOfst: list[int] = list()
+  for (idcode, far_frames) in baseline_bit.get_per_far_configuration_arrays().items():
+    farInt_rowIdxs = idcode_farInt_rowIdxs.setdefault(idcode, dict())
+    for (far, frames) in far_frames.items():
+      rowIdxs = farInt_rowIdxs.setdefault(far.to_int(), list())
+      for frame in frames:
+        rowIdxs.append(len(frames_words))
+        frames_words.append(frame.words)
+        frames_byteOfst.append(frame.byte_ofst)
+
+  # np.stack() would convert the words to the native byte order, so the dtype is explicit.
+  np.save(dump_dir / _BASELINE_WORDS_FILENAME, np.array(frames_words, dtype=bit_spec.BITSTREAM_ENDIANNESS))
+  joblib.dump(
+    (baseline_bit.header.fpga_part, idcode_farInt_rowIdxs, frames_byteOfst),
+    dump_dir / _BASELINE_INDEX_FILENAME
+  )
 
+# Loads the baseline's configuration frames from a directory written by dump_baseline().
+# The frame words are memory-mapped, so all workers share the same pages of the kernel's
+# page cache instead of each holding a copy. Worker processes are reused across tasks,
+# so the result is cached to load the files only once per worker.
+@functools.lru_cache(maxsize=1)
+def load_baseline_dump(
+  dump_dir: Path
+) -> IndividualConfigurationArrays:
+  words = np.load(dump_dir / _BASELINE_WORDS_FILENAME, mmap_mode="r")
+  (fpga_part, idcode_farInt_rowIdxs, frames_byteOfst) = joblib.load(dump_dir / _BASELINE_INDEX_FILENAME)
 
-  # Sanity check that all IDCODEs are identical (they must be as otherwise changing something in
-  # one column would cause a column in another SLR to change).
-  assert len(set(diff_idcodes)) == 1, f"Error: Found multiple different bits in multiple IDCODEs!"
+  ar_spec = ArchSpec.create_spec(fpga_part)
 
-  return (diff_idcodes[0], diff_fars, diff_frameOfsts)
+  baseline: IndividualConfigurationArrays = dict()
+  for (idcode, farInt_rowIdxs) in idcode_farInt_rowIdxs.items():
+    far_frames = baseline[idcode] = dict()
+    for (far_int, rowIdxs) in farInt_rowIdxs.items():
+      far = FrameAddressRegister.from_int(far_int, ar_spec)
+      far_frames[far] = [
+        ConfigFrame(frames_byteOfst[row_idx], words[row_idx], far, ar_spec)
+        for row_idx in rowIdxs
+      ]
+
+  return baseline
+
+# Same as locate_config_difference(), but the baseline is loaded from a dump file
+# and compared against multiple modified bitstreams. A single diff only takes a few
+# milliseconds, so comparing a batch of bitstreams per task amortizes joblib's
+# per-task overhead.
+def locate_config_differences_from_dump(
+  baseline_dump_dir: Path,
+  modified_paths: list[Path]
+) -> list[tuple[
+  int, # IDCODE
+  list[FrameAddressRegister], # FARs
+  np.ndarray, # frame_ofsts
+  np.ndarray # active-high
+]]:
+  baseline = load_baseline_dump(baseline_dump_dir)
+  return [
+    locate_config_difference(baseline, modified_path)
+    for modified_path in modified_paths
+  ]
 
 def extract_lut_encoding(
-  baseline_bit_path: Path,
+  baseline_bit: Bitstream,
   input_bit_paths: list[Path],
   process_cnt: int
 ) -> list[tuple[
@@ -154,11 +255,15 @@ def extract_lut_encoding(
   int, # lut equation idx
   int, # IDCODE
   list[FrameAddressRegister], # FARs (multiple bits can change, hence why we return a list)
-  list[str], # frame_ofsts (multiple bits can change, hence why we return a list). The str encodes the bit number and it's active-high/active-low status.
+  np.ndarray, # frame_ofsts (multiple bits can change, hence why we return an array)
+  np.ndarray, # active-high/active-low status of every frame_ofst
 ]]:
-  # Use the lut idx in the file name to bucketize all paths.
-  #   lut_idx -> iterable[Path]
-  split_by_lut = miter.bucket(input_bit_paths, key=extract_lut_idx_from_filename)
+  # Use the lut idx in the file name to bucketize all paths. Every file name is parsed once.
+  #   lut_idx -> list[(lut_equation, Path)]
+  split_by_lut: dict[int, list[tuple[str, Path]]] = defaultdict(list)
+  for p in input_bit_paths:
+    (lut_idx, lut_equation) = extract_filename_fields(p)
+    split_by_lut[lut_idx].append((lut_equation, p))
 
   # LUTs are indexed as follows:
   #
@@ -169,45 +274,69 @@ def extract_lut_encoding(
   #     y_ofst = 59 -> lut_idx = 472 .. 479 (A6LUT .. H6LUT)
 
   # We prepare a set of batch arguments that we can then feed to a function
-  # through joblib so we can parallelize encoding extraction.
-  batch_args = list()
+  # through joblib so we can parallelize encoding extraction. There is one batch
+  # per LUT which contains all its equations.
+  batch_args: list[tuple[
+    int, # lut idx
+    list[tuple[
+      int, # lut equation idx
+      Path # modified bitstream path
+    ]]
+  ]] = list()
   for lut_idx in sorted(split_by_lut):
-    modified_bit_paths = sorted(split_by_lut[lut_idx])
-    for modified_bit_path in modified_bit_paths:
-      lut_equation = extract_lut_equation_from_filename(modified_bit_path)
-      assert is_one_hot_equation(lut_equation), f"Error: equation \"{lut_equation}\" is not a one-hot equation!"
-      lut_equation_bit_idx = int(math.log2(int(lut_equation, 2)))
-
-      batch_args.append((
-        lut_idx,
-        lut_equation_bit_idx,
-        baseline_bit_path,
-        modified_bit_path
-      ))
+    lutEqIdx_modifiedPath_list = list()
+    for (lut_equation, modified_bit_path) in sorted(split_by_lut[lut_idx], key=lambda tup: tup[1]):
+      lut_equation_int = int(lut_equation, 2)
+      assert is_power_of_two(lut_equation_int), f"Error: equation \"{lut_equation}\" is not a one-hot equation!"
+      # The equation is one-hot, so the index of its only set bit is its bit length minus 1.
+      # This stays in integer arithmetic instead of going through a float log2().
+      lut_equation_bit_idx = lut_equation_int.bit_length() - 1
+      lutEqIdx_modifiedPath_list.append((lut_equation_bit_idx, modified_bit_path))
+
+    batch_args.append((lut_idx, lutEqIdx_modifiedPath_list))
 
   # # Debug
   # print(batch_args)
 
-  idcode_fars_frameOfsts_list = joblib.Parallel(
-    n_jobs=process_cnt,
-    verbose=10
-  )(
-    joblib.delayed(
-      locate_config_difference
-    )(
-      baseline_path, modified_path
-    ) for (_, _, baseline_path, modified_path) in batch_args
-  )
+  # The baseline is parsed once here instead of once per comparison. Its configuration
+  # frames are dumped to a temporary directory that every worker memory-maps.
+  baseline_valid = (not baseline_bit.is_partial()) and (not baseline_bit.is_compressed())
+  assert baseline_valid, f"Error: baseline must be a full uncompressed bitstream!"
+
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    baseline_dump_dir = Path(tmp_dir)
+    dump_baseline(baseline_bit, baseline_dump_dir)
+
+    # The loky backend keeps its worker processes alive between tasks, which is what
+    # lets load_baseline_dump() reuse the baseline it loaded for a previous task.
+    # Every task is already a coarse batch, so joblib must not group them further.
+    try:
+      idcode_fars_frameOfsts_activeHigh_lists = joblib.Parallel(
+        n_jobs=process_cnt,
+        backend="loky",
+        batch_size=1,
+        verbose=10
+      )(
+        joblib.delayed(
+          locate_config_differences_from_dump
+        )(
+          baseline_dump_dir, [modified_path for (_, modified_path) in lutEqIdx_modifiedPath_list]
+        ) for (_, lutEqIdx_modifiedPath_list) in batch_args
+      )
+    finally:
+      # With a single job, joblib runs the tasks in this process, so the cache would keep
+      # the memory-mapped baseline alive after its directory is deleted.
+      load_baseline_dump.cache_clear()
 
   # Sanity check that all IDCODEs are the same.
 
-  lutIdx_lutEqIdx_idcode_fars_frameOfsts_list = [
-    (lut_idx, lut_equation_idx, idcode, fars, frame_ofsts)
-    for ((lut_idx, lut_equation_idx, _, _), (idcode, fars, frame_ofsts))
-    in zip(batch_args, idcode_fars_frameOfsts_list)
+  lutIdx_lutEqIdx_idcode_fars_frameOfsts_activeHigh_list = [
+    (lut_idx, lut_equation_idx, idcode, fars, frame_ofsts, active_high)
+    for ((lut_idx, lutEqIdx_modifiedPath_list), idcode_fars_frameOfsts_activeHigh_list) in zip(batch_args, idcode_fars_frameOfsts_activeHigh_lists)
+    for ((lut_equation_idx, _), (idcode, fars, frame_ofsts, active_high)) in zip(lutEqIdx_modifiedPath_list, idcode_fars_frameOfsts_activeHigh_list)
   ]
 
-  return lutIdx_lutEqIdx_idcode_fars_frameOfsts_list
+  return lutIdx_lutEqIdx_idcode_fars_frameOfsts_activeHigh_list
 
 def dump_logic_loc(
   lutIdx_lutEqIdx_idcode_far_frameOfst_list: list[tuple[
@@ -215,7 +344,8 @@ def dump_logic_loc(
     int, # lut equation idx
     int, # IDCODE
     list[FrameAddressRegister], # FARs (multiple bits can change, hence why we use a list)
-    list[str], # frame_ofsts (multiple bits can change, hence why we return a list). The str encodes the bit number and it's active-high/active-low status.
+    np.ndarray, # frame_ofsts (multiple bits can change, hence why we use an array)
+    np.ndarray, # active-high/active-low status of every frame_ofst
   ]],
   fpga_part: str,
   out_file: str
@@ -236,66 +366,101 @@ def dump_logic_loc(
   dev_summary = resources.get_device_summary(fpga_part)
   ar_spec = ArchSpec.create_spec(fpga_part)
 
-  lines: list[str] = list()
-  for (lut_idx, lut_equation_idx, idcode, fars, frame_ofsts) in lutIdx_lutEqIdx_idcode_far_frameOfst_list:
-    # We use -1 as the bit offset so it is immediately obvious this is not an
-    # official file generated by vivado, but a placeholder with similar structure.
-    bit_ofst = -1
-    slr_name = dev_summary.get_slr_name(idcode)
-    slr_idx = dev_summary.get_slr_idx(slr_name)
-    # We use any number for the X offset as it doesn't matter. We just need the
-    # format to be valid, so I use 0.
-    x_ofst = 0
-    y_ofst = lut_idx // ar_spec.num_lut_per_clb()
-    # I use a custom "Lut" type here to differentiate it from a LUTRAM/LUTROM.
-    # This is just for internal parsing purposes later as I want to differentiate
-    # between a LutramLoc and a LutLoc. A LutramLoc has the mem_type field set to
-    # (Rom|Ram) whereas a LutLoc has the field set to Lut.
-    mem_type = "Lut"
-    lut_ofst_in_clb = lut_idx % ar_spec.num_lut_per_clb()
-    mem_id = lutIdx_to_name[lut_ofst_in_clb]
-    mem_bit = lut_equation_idx
-
-    # Note that we have just changed 1 bit in a LUT's equation, but multiple bits change
-    # in the underlying bitstream (see below for an example).
-    #
-    #   lut_gen[0].lut6_inst_b0000000000000000000000000000000000000000000000000000000000000001.bit.gz
-    #   BLOCK_TYPE = CLB_IO_CLK, ROW_ADDR = 0, COL_ADDR = 167, MINOR_ADDR = 0, FRAME_OFST = 15
-    #   BLOCK_TYPE = CLB_IO_CLK, ROW_ADDR = 0, COL_ADDR = 167, MINOR_ADDR = 0, FRAME_OFST = 1923
-    #   BLOCK_TYPE = CLB_IO_CLK, ROW_ADDR = 0, COL_ADDR = 167, MINOR_ADDR = 0, FRAME_OFST = 1927
-    #   BLOCK_TYPE = CLB_IO_CLK, ROW_ADDR = 0, COL_ADDR = 167, MINOR_ADDR = 0, FRAME_OFST = 1935
-    #   BLOCK_TYPE = CLB_IO_CLK, ROW_ADDR = 0, COL_ADDR = 167, MINOR_ADDR = 0, FRAME_OFST = 1943
-    #   BLOCK_TYPE = CLB_IO_CLK, ROW_ADDR = 0, COL_ADDR = 167, MINOR_ADDR = 0, FRAME_OFST = 1963
-    #
-    # The equation bit is the "outlier" (15 above). The other 5 bits are auxiliary control bits.
-    #
-    # To find the outlier we are interested in, we compute the median and select the
-    # element furthest from it.
-
-    # We transform the frame offsets to a numpy array so we can use its median computation code.
-    frame_ofsts = np.array(frame_ofsts, dtype=np.uint32)
-    median = np.median(frame_ofsts)
+  # Note that we have just changed 1 bit in a LUT's equation, but multiple bits change
+  # in the underlying bitstream (see below for an example).
+  #
+  #   lut_gen[0].lut6_inst_b0000000000000000000000000000000000000000000000000000000000000001.bit.gz
+  #   BLOCK_TYPE = CLB_IO_CLK, ROW_ADDR = 0, COL_ADDR = 167, MINOR_ADDR = 0, FRAME_OFST = 15
+  #   BLOCK_TYPE = CLB_IO_CLK, ROW_ADDR = 0, COL_ADDR = 167, MINOR_ADDR = 0, FRAME_OFST = 1923
+  #   BLOCK_TYPE = CLB_IO_CLK, ROW_ADDR = 0, COL_ADDR = 167, MINOR_ADDR = 0, FRAME_OFST = 1927
+  #   BLOCK_TYPE = CLB_IO_CLK, ROW_ADDR = 0, COL_ADDR = 167, MINOR_ADDR = 0, FRAME_OFST = 1935
+  #   BLOCK_TYPE = CLB_IO_CLK, ROW_ADDR = 0, COL_ADDR = 167, MINOR_ADDR = 0, FRAME_OFST = 1943
+  #   BLOCK_TYPE = CLB_IO_CLK, ROW_ADDR = 0, COL_ADDR = 167, MINOR_ADDR = 0, FRAME_OFST = 1963
+  #
+  # The equation bit is the "outlier" (15 above). The other 5 bits are auxiliary control bits.
+  #
+  # To find the outlier we are interested in, we compute the median and select the
+  # element furthest from it.
+  #
+  # The records are tiny, so calling numpy once per record would be dominated by call
+  # overhead. We instead group the records by their number of frame offsets, stack
+  # every group into a 2D array, and find the outliers of a whole group at once.
+  numFrameOfsts_recordIdxs: dict[int, list[int]] = defaultdict(list)
+  for (record_idx, (lut_idx, lut_equation_idx, _, _, frame_ofsts, active_high)) in enumerate(lutIdx_lutEqIdx_idcode_far_frameOfst_list):
+    # The logic location format (and its parser in logic_location.py) has no way to
+    # encode the polarity of a bit, so all bits must be active-high. This is checked
+    # before the output file is opened so no partial file is written.
+    assert np.all(active_high), f"Error: LUT {lut_idx} equation bit {lut_equation_idx} changes active-low bits, which cannot be written to a logic location file!"
+    numFrameOfsts_recordIdxs[len(frame_ofsts)].append(record_idx)
+
+  record_frameOfsts: list[list[int]] = [None] * len(lutIdx_lutEqIdx_idcode_far_frameOfst_list)
+  record_largestDeltaIdx: list[int] = [None] * len(lutIdx_lutEqIdx_idcode_far_frameOfst_list)
+  for (num_frame_ofsts, record_idxs) in numFrameOfsts_recordIdxs.items():
+    frame_ofsts = np.array(
+      [lutIdx_lutEqIdx_idcode_far_frameOfst_list[record_idx][4] for record_idx in record_idxs],
+      dtype=np.uint32
+    ).reshape(len(record_idxs), num_frame_ofsts)
+    median = np.median(frame_ofsts, axis=1, keepdims=True)
     delta_to_median = np.abs(frame_ofsts - median)
-    largest_delta_idx = np.argmax(delta_to_median)
-
-    equation_far: FrameAddressRegister = None
-    equation_frame_ofst: int = None
-    auxiliary_fars: list[FrameAddressRegister] = list()
-    auxiliary_frame_ofsts: list[int] = list()
-    for lidx in range(len(fars)):
-      if lidx == largest_delta_idx:
-        equation_far = fars[lidx]
-        equation_frame_ofst = frame_ofsts[lidx]
-      else:
-        auxiliary_fars.append(fars[lidx])
-        auxiliary_frame_ofsts.append(frame_ofsts[lidx])
-
-    auxiliary_fars_str = ":".join([f"0x{far.to_hex()}" for far in auxiliary_fars])
-    auxiliary_frame_ofsts_str = ":".join([f"{aux_frame_ofst}" for aux_frame_ofst in auxiliary_frame_ofsts])
-    lines.append(f"Bit {bit_ofst} 0x{equation_far.to_hex()} {equation_frame_ofst} {slr_name} {slr_idx} Block=SLICE_X{x_ofst}Y{y_ofst} {mem_type}={mem_id}:{mem_bit} AuxiliaryFars={auxiliary_fars_str} AuxiliaryFrameOfsts={auxiliary_frame_ofsts_str}")
-
-  with open(out_file, "w") as f_out:
-    f_out.write("\n".join(lines))
+    largest_delta_idxs = np.argmax(delta_to_median, axis=1)
+
+    for (record_idx, ofsts, largest_delta_idx) in zip(record_idxs, frame_ofsts.tolist(), largest_delta_idxs.tolist()):
+      record_frameOfsts[record_idx] = ofsts
+      record_largestDeltaIdx[record_idx] = largest_delta_idx
+
+  # There are very few IDCODEs (one per SLR), so their SLR name and index are looked
+  # up once instead of once per record.
+  idcode_slrName_slrIdx: dict[int, tuple[str, int]] = dict()
+  for (_, _, idcode, _, _, _) in lutIdx_lutEqIdx_idcode_far_frameOfst_list:
+    if idcode not in idcode_slrName_slrIdx:
+      slr_name = dev_summary.get_slr_name(idcode)
+      idcode_slrName_slrIdx[idcode] = (slr_name, dev_summary.get_slr_idx(slr_name))
+
+  num_lut_per_clb = ar_spec.num_lut_per_clb()
+
+  # The lines are streamed to the file instead of first being joined into one large string.
+  def gen_lines() -> typing.Iterator[str]:
+    for (record_idx, (lut_idx, lut_equation_idx, idcode, fars, _, _)) in enumerate(lutIdx_lutEqIdx_idcode_far_frameOfst_list):
+      # We use -1 as the bit offset so it is immediately obvious this is not an
+      # official file generated by vivado, but a placeholder with similar structure.
+      bit_ofst = -1
+      (slr_name, slr_idx) = idcode_slrName_slrIdx[idcode]
+      # We use any number for the X offset as it doesn't matter. We just need the
+      # format to be valid, so I use 0.
+      x_ofst = 0
+      (y_ofst, lut_ofst_in_clb) = divmod(lut_idx, num_lut_per_clb)
+      # I use a custom "Lut" type here to differentiate it from a LUTRAM/LUTROM.
+      # This is just for internal parsing purposes later as I want to differentiate
+      # between a LutramLoc and a LutLoc. A LutramLoc has the mem_type field set to
+      # (Rom|Ram) whereas a LutLoc has the field set to Lut.
+      mem_type = "Lut"
+      mem_id = lutIdx_to_name[lut_ofst_in_clb]
+      mem_bit = lut_equation_idx
+
+      largest_delta_idx = record_largestDeltaIdx[record_idx]
+
+      frame_ofsts = record_frameOfsts[record_idx]
+
+      equation_far: FrameAddressRegister = None
+      equation_frame_ofst: int = None
+      auxiliary_fars: list[FrameAddressRegister] = list()
+      auxiliary_frame_ofsts: list[int] = list()
+      for lidx in range(len(fars)):
+        if lidx == largest_delta_idx:
+          equation_far = fars[lidx]
+          equation_frame_ofst = frame_ofsts[lidx]
+        else:
+          auxiliary_fars.append(fars[lidx])
+          auxiliary_frame_ofsts.append(frame_ofsts[lidx])
+
+      auxiliary_fars_str = ":".join([f"0x{far.to_hex()}" for far in auxiliary_fars])
+      auxiliary_frame_ofsts_str = ":".join([f"{aux_frame_ofst}" for aux_frame_ofst in auxiliary_frame_ofsts])
+      # Lines are separated (not terminated) by newlines.
+      line_sep = "" if record_idx == 0 else "\n"
+      yield f"{line_sep}Bit {bit_ofst} 0x{equation_far.to_hex()} {equation_frame_ofst} {slr_name} {slr_idx} Block=SLICE_X{x_ofst}Y{y_ofst} {mem_type}={mem_id}:{mem_bit} AuxiliaryFars={auxiliary_fars_str} AuxiliaryFrameOfsts={auxiliary_frame_ofsts_str}"
+
+  with open(out_file, "w", buffering=1 << 20) as f_out:
+    f_out.writelines(gen_lines())
 
 # Main program (if executed as script)
 if __name__ == "__main__":
@@ -167,7 +167,15 @@ if __name__ == "__main__":
   # Reverse-engineer architecture parameters.
   ######################################################################################################################
 
-  part_summary = {part: resources.get_device_summary(part) for part in part_partTargetDir}
+  # Loading the summaries is dominated by file reads and JSON decoding, so threads are
+  # enough to overlap them. The summaries stay cached in this process for later use.
+  summaries = joblib.Parallel(
+    n_jobs=args.process_cnt,
+    backend="threading"
+  )(
+    joblib.delayed(resources.get_device_summary)(part) for part in part_partTargetDir
+  )
+  part_summary = dict(zip(part_partTargetDir, summaries))
 
   for (archShortName, archTargetDir) in archShortName_archTargetDir.items():
     # We select the smallest part in each architecture for these experiments to reduce compile times.
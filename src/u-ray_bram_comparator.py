@@ -1,10 +1,30 @@
 # author: Sahand Kashani <sahand.kashani@epfl.ch>
 
 import argparse
+import mmap
 import re
 
+import numpy as np
+
 import resources
 
+# Compiled once as it is matched against the whole DB file. The pattern is a bytes
+# pattern as it is matched against the memory-mapped file.
+#   group 1 = lower/upper, group 2 = key, group 3 = init idx (hex), group 4 = bit idx (dec),
+#   group 5 = minor, group 6 = frame ofst
+_INIT_PATTERN = re.compile(rb"BRAM\.RAMB18E2_([LU])\.(INITP?)_([0-9a-fA-F]{2})\[(\d+)\] (\d+)_(\d+)")
+
+# Value of every ASCII hex digit, indexed by its byte value.
+_HEX_DIGIT_VALUES = np.zeros(256, dtype=np.uint8)
+for (digit_value, digit) in enumerate("0123456789abcdef"):
+  _HEX_DIGIT_VALUES[ord(digit)] = digit_value
+  _HEX_DIGIT_VALUES[ord(digit.upper())] = digit_value
+
+# Value of every 2-digit ASCII hex number, indexed by its 2 bytes read as a
+# little-endian uint16 (first digit in the low byte).
+_HEX_BYTE_PAIRS = np.arange(1 << 16, dtype=np.uint32)
+_HEX_PAIR_VALUES = (_HEX_DIGIT_VALUES[_HEX_BYTE_PAIRS & 0xff] << 4) | _HEX_DIGIT_VALUES[_HEX_BYTE_PAIRS >> 8]
+
 # Main program (if executed as script)
 if __name__ == "__main__":
   parser = argparse.ArgumentParser(description="Compares BRAM minor/frame_ofsts with those of project U-Ray.")
@@ -19,60 +39,58 @@ if __name__ == "__main__":
   (our_lower_parity_minors, our_lower_parity_frameOfsts) = arch_summary.get_bram_parity_loc(0)
   (our_upper_parity_minors, our_upper_parity_frameOfsts) = arch_summary.get_bram_parity_loc(1)
 
-  their_lower_mem_minors = [0] * len(our_lower_mem_minors)
-  their_lower_mem_frameOfsts = [0] * len(our_lower_mem_frameOfsts)
-  their_lower_parity_minors = [0] * len(our_lower_parity_minors)
-  their_lower_parity_frameOfsts = [0] * len(our_lower_parity_frameOfsts)
-
-  their_upper_mem_minors = [0] * len(our_upper_mem_minors)
-  their_upper_mem_frameOfsts = [0] * len(our_upper_mem_frameOfsts)
-  their_upper_parity_minors = [0] * len(our_upper_parity_minors)
-  their_upper_parity_frameofsts = [0] * len(our_upper_parity_frameOfsts)
-
-  with open(args.uray_bram_db, "r") as f:
-    lines = [l.strip() for l in f.readlines()]
-
-    for line in lines:
-      init_pattern = r"BRAM\.RAMB18E2_(?P<lower_upper>[LU])\.(?P<key>INITP?)_(?P<init_idx_hex>[0-9a-fA-F]{2})\[(?P<bit_idx_dec>\d+)\] (?P<minor>\d+)_(?P<frame_ofst>\d+)"
-      init_match = re.search(init_pattern, line)
-      if init_match:
-
-        lower_upper = init_match.group("lower_upper")
-        key = init_match.group("key")
-        init_idx_hex = init_match.group("init_idx_hex")
-        init_idx = int(init_idx_hex, 16)
-        bit_idx = int(init_match.group("bit_idx_dec"))
-        minor = int(init_match.group("minor"))
-        frame_ofst = int(init_match.group("frame_ofst"))
-
-        # print(f"init_idx = {init_idx}, bit_idx = {bit_idx}, minor = {minor}, frame_ofst = {frame_ofst}")
-
-        is_lower = lower_upper == "L"
-        is_mem = key == "INIT"
-
-        abs_idx = init_idx * 256 + bit_idx
-
-        if is_lower and is_mem:
-          their_lower_mem_minors[abs_idx] = minor
-          their_lower_mem_frameOfsts[abs_idx] = frame_ofst
-        elif is_lower and not is_mem:
-          their_lower_parity_minors[abs_idx] = minor
-          their_lower_parity_frameOfsts[abs_idx] = frame_ofst
-        elif not is_lower and is_mem:
-          their_upper_mem_minors[abs_idx] = minor
-          their_upper_mem_frameOfsts[abs_idx] = frame_ofst
-        elif not is_lower and not is_mem:
-          their_upper_parity_minors[abs_idx] = minor
-          their_upper_parity_frameofsts[abs_idx] = frame_ofst
-
-  assert our_lower_mem_minors == their_lower_mem_minors
-  assert our_lower_mem_frameOfsts == their_lower_mem_frameOfsts
-  assert our_lower_parity_minors == their_lower_parity_minors
-  assert our_lower_parity_frameOfsts == their_lower_parity_frameOfsts
-
-  assert our_upper_mem_minors == their_upper_mem_minors
-  assert our_upper_mem_frameOfsts == their_upper_mem_frameOfsts
-  assert our_upper_parity_minors == their_upper_parity_minors
-  assert our_upper_parity_frameOfsts == their_upper_parity_frameofsts
+  their_lower_mem_minors = np.zeros(len(our_lower_mem_minors), dtype=np.int32)
+  their_lower_mem_frameOfsts = np.zeros(len(our_lower_mem_frameOfsts), dtype=np.int32)
+  their_lower_parity_minors = np.zeros(len(our_lower_parity_minors), dtype=np.int32)
+  their_lower_parity_frameOfsts = np.zeros(len(our_lower_parity_frameOfsts), dtype=np.int32)
+
+  their_upper_mem_minors = np.zeros(len(our_upper_mem_minors), dtype=np.int32)
+  their_upper_mem_frameOfsts = np.zeros(len(our_upper_mem_frameOfsts), dtype=np.int32)
+  their_upper_parity_minors = np.zeros(len(our_upper_parity_minors), dtype=np.int32)
+  their_upper_parity_frameofsts = np.zeros(len(our_upper_parity_frameOfsts), dtype=np.int32)
+
+  # All INIT entries of the file are matched at once. The file is memory-mapped so
+  # the regex scans the page cache directly instead of a copy of the file. Every row
+  # of the array holds the 6 fields of one entry.
+  with open(args.uray_bram_db, "rb") as f:
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+      init_fields = np.array(_INIT_PATTERN.findall(mm), dtype=bytes).reshape(-1, 6)
+
+  is_lower = init_fields[:, 0] == b"L"
+  is_mem = init_fields[:, 1] == b"INIT"
+  # numpy cannot parse base-16 strings, so the 2 hex digits of every init idx are
+  # viewed as a single uint16 and converted with one lookup in a precomputed table.
+  init_idx = _HEX_PAIR_VALUES[init_fields[:, 2].astype("S2").view("<u2")].astype(np.int64)
+  bit_idx = init_fields[:, 3].astype(np.int64)
+  minor = init_fields[:, 4].astype(np.int32)
+  frame_ofst = init_fields[:, 5].astype(np.int32)
+
+  abs_idx = (init_idx << 8) | bit_idx
+
+  # Every entry is written to its location with one masked fancy-indexing assignment
+  # per (lower/upper, mem/parity) group. This is a negligible part of the runtime next
+  # to the regex scan above, so there is no compiled scatter loop.
+  for (their_minors, their_frameOfsts, mask) in [
+    (their_lower_mem_minors, their_lower_mem_frameOfsts, is_lower & is_mem),
+    (their_lower_parity_minors, their_lower_parity_frameOfsts, is_lower & ~is_mem),
+    (their_upper_mem_minors, their_upper_mem_frameOfsts, ~is_lower & is_mem),
+    (their_upper_parity_minors, their_upper_parity_frameofsts, ~is_lower & ~is_mem)
+  ]:
+    their_minors[abs_idx[mask]] = minor[mask]
+    their_frameOfsts[abs_idx[mask]] = frame_ofst[mask]
+
+  # Every pair of locations is compared with np.array_equal(), which compares
+  # the packed ints of both sides at once.
+  our_their_locs = [
+    (our_lower_mem_minors, their_lower_mem_minors),
+    (our_lower_mem_frameOfsts, their_lower_mem_frameOfsts),
+    (our_lower_parity_minors, their_lower_parity_minors),
+    (our_lower_parity_frameOfsts, their_lower_parity_frameOfsts),
+    (our_upper_mem_minors, their_upper_mem_minors),
+    (our_upper_mem_frameOfsts, their_upper_mem_frameOfsts),
+    (our_upper_parity_minors, their_upper_parity_minors),
+    (our_upper_parity_frameOfsts, their_upper_parity_frameofsts),
+  ]
+  assert all(np.array_equal(our_locs, their_locs) for (our_locs, their_locs) in our_their_locs), f"Error: BRAM locations differ from U-Ray's!"
 
   print(f"All OK")
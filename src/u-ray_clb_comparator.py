@@ -1,96 +1,120 @@
 # author: Sahand Kashani <sahand.kashani@epfl.ch>
 
 import argparse
+import array
 import re
-from collections import defaultdict
+import typing
 
-import resources
+import joblib
+import numpy as np
 
+import resources
 
+# Compiled once as it is matched against every line of the DB files. The DB files
+# are pure ASCII, so they are read and matched as bytes to skip decoding them. It
+# matches both LUT and FF lines:
+#   group 1 = letter, group 2 = init idx (LUT only), group 3 = ff type (FF only),
+#   group 4 = minor, group 5 = frame ofst
+_CONFIG_PATTERN = re.compile(rb"([ABCDEFGH])(?:LUT\.INIT\[(\d+)\]|(FF2?)\.INIT\.V0)\s+(\d+)_(\d+)")
+
+# Resource keys of the matched (letter) and (letter, ff type) fields. They are built
+# once here instead of formatting a new key for every matched line.
+_LUT_KEY_OF_LETTER = {
+  letter.encode(): f"{letter}6LUT"
+  for letter in "ABCDEFGH"
+}
+_REG_KEY_OF_LETTER_FFTYPE = {
+  (letter.encode(), ff_type.encode()): f"{letter}{ff_type}"
+  for letter in "ABCDEFGH"
+  for ff_type in ["FF", "FF2"]
+}
+
+_LUT_KEYS = list(_LUT_KEY_OF_LETTER.values())
+_REG_KEYS = list(_REG_KEY_OF_LETTER_FFTYPE.values())
+
+# Yields the lines of the DB one at a time so the file is never held in memory.
+#
+# The lines are passed on as-is. The leading tile type name prefix does not need to be
+# discarded as the LUT/FF keys are found at the end of the line's first field, and the
+# trailing newline is tolerated by the regex. This avoids copying every line.
 def parse_db(
   db_file: str
-) -> list[str]:
-  with open(db_file, "r") as f:
-    lines = [l.strip() for l in f.readlines()]
-    # We discard the leading tile type name prefix so we can compare many different tile types
-    # using the same code later.
-
-    new_lines = list()
-    for l in lines:
-      start_idx = l.find(".")
-      # The +1 is to skip the "." itself.
-      new_line = l[start_idx+1:]
-      new_lines.append(new_line)
-
-    return new_lines
-
-def extract_lut_config(
-  lines: list[str]
+) -> typing.Iterator[bytes]:
+  with open(db_file, "rb") as f:
+    yield from f
+
+def extract_configs(
+  lines: typing.Iterable[bytes]
 ) -> tuple[
   dict[
     str, # resource (A6LUT, B6LUT, ...)
-    list[int] # minors
+    array.array # minors
   ],
   dict[
     str, # resource (A6LUT, B6LUT, ...)
-    list[int] # frame_ofsts
-  ]
-]:
-  minor_config = defaultdict(
-    lambda: [0] * 64
-  )
-  frameOfst_config = defaultdict(
-    lambda: [0] * 64
-  )
-
-  for line in lines:
-    lut_pattern = r"(?P<letter>[ABCDEFGH])LUT\.INIT\[(?P<init_idx>\d+)\]\s+(?P<minor>\d+)_(?P<frame_ofst>\d+)"
-    lut_match = re.search(lut_pattern, line)
-
-    if lut_match:
-      letter = lut_match.group("letter")
-      init_idx = int(lut_match.group("init_idx"))
-      minor = int(lut_match.group("minor"))
-      frame_ofst = int(lut_match.group("frame_ofst"))
-
-      key = f"{letter}6LUT"
-
-      minor_config[key][init_idx] = minor
-      frameOfst_config[key][init_idx] = frame_ofst
-
-  return (minor_config, frameOfst_config)
-
-def extract_reg_config(
-  lines: list[str]
-) -> tuple[
+    array.array # frame_ofsts
+  ],
   dict[
     str, # resource (AFF, BFF, ...)
-    list[int] # minors
+    int # minor
   ],
   dict[
     str, # resource (AFF, BFF, ...)
-    list[int] # frame_ofsts
+    int # frame_ofst
   ]
 ]:
-  minor_config = dict()
-  frameOfst_config = dict()
-
+  # The LUTs are known in advance, so their configs are preallocated as packed int
+  # arrays instead of being created on demand.
+  lut_minor_config = {
+    key: array.array("i", [0] * 64)
+    for key in _LUT_KEYS
+  }
+  lut_frameOfst_config = {
+    key: array.array("i", [0] * 64)
+    for key in _LUT_KEYS
+  }
+  reg_minor_config = dict()
+  reg_frameOfst_config = dict()
+
+  # The LUT and FF configs are extracted in a single pass over the lines.
   for line in lines:
-    reg_pattern = r"(?P<letter>[ABCDEFGH])(?P<ff_type>FF2?)\.INIT\.V0\s+(?P<minor>\d+)_(?P<frame_ofst>\d+)"
-    reg_match = re.search(reg_pattern, line)
-
-    if reg_match:
-      letter = reg_match.group("letter")
-      ff_type = reg_match.group("ff_type")
-      minor = int(reg_match.group("minor"))
-      frame_ofst = int(reg_match.group("frame_ofst"))
-
-      key = f"{letter}{ff_type}"
-
-      minor_config[key] = minor
-      frameOfst_config[key] = frame_ofst
-
-  return (minor_config, frameOfst_config)
+    # Lines that do not contain the literal part of a pattern can never match. Both
+    # patterns contain ".INIT", so most other lines are skipped with a single test.
+    if b".INIT" not in line:
+      continue
+
+    # The remaining lines are matched with the compiled regex directly. Splitting them
+    # with bytes operations takes several interpreted calls per line and was measured
+    # to be slower than a single search() in C.
+    config_match = _CONFIG_PATTERN.search(line)
+    if not config_match:
+      continue
+
+    (letter, init_idx_str, ff_type, minor_str, frame_ofst_str) = config_match.groups()
+    minor = int(minor_str)
+    frame_ofst = int(frame_ofst_str)
+
+    if init_idx_str is not None:
+      key = _LUT_KEY_OF_LETTER[letter]
+      init_idx = int(init_idx_str)
+      lut_minor_config[key][init_idx] = minor
+      lut_frameOfst_config[key][init_idx] = frame_ofst
+    else:
+      key = _REG_KEY_OF_LETTER_FFTYPE[(letter, ff_type)]
+      reg_minor_config[key] = minor
+      reg_frameOfst_config[key] = frame_ofst
+
+  return (lut_minor_config, lut_frameOfst_config, reg_minor_config, reg_frameOfst_config)
+
+def extract_db_configs(
+  db_file: str
+) -> tuple[
+  dict[str, array.array], # LUT minors
+  dict[str, array.array], # LUT frame_ofsts
+  dict[str, int], # FF minors
+  dict[str, int] # FF frame_ofsts
+]:
+  return extract_configs(parse_db(db_file))
 
 # Main program (if executed as script)
 if __name__ == "__main__":
@@ -99,60 +123,62 @@ if __name__ == "__main__":
   parser.add_argument("uray_clel_r_db", type=str, help="Input CLEL_R DB from project U-Ray.")
   parser.add_argument("uray_clem_db", type=str, help="Input CLEM DB from project U-Ray.")
   parser.add_argument("uray_clem_r_db", type=str, help="Input CLEM_R DB from project U-Ray.")
+  parser.add_argument("--process_cnt", type=int, default=1, help="Joblib parallelism (use -1 to use all cores).")
   args = parser.parse_args()
 
   fpga_part = "xcau25p-ffvb676-1-e"
   arch_summary = resources.get_arch_summary(fpga_part)
 
-  clel_l_lines = parse_db(args.uray_clel_l_db)
-  clel_r_lines = parse_db(args.uray_clel_r_db)
-  clem_lines = parse_db(args.uray_clem_db)
-  clem_r_lines = parse_db(args.uray_clem_r_db)
-
-  (their_clel_l_lut_minors, their_clel_l_lut_frameOfsts) = extract_lut_config(clel_l_lines)
-  (their_clel_r_lut_minors, their_clel_r_lut_frameOfsts) = extract_lut_config(clel_r_lines)
-  (their_clem_lut_minors, their_clem_lut_frameOfsts) = extract_lut_config(clem_lines)
-  (their_clem_r_lut_minors, their_clem_r_lut_frameOfsts) = extract_lut_config(clem_r_lines)
-
-  (their_clel_l_reg_minors, their_clel_l_reg_frameOfsts) = extract_reg_config(clel_l_lines)
-  (their_clel_r_reg_minors, their_clel_r_reg_frameOfsts) = extract_reg_config(clel_r_lines)
-  (their_clem_reg_minors, their_clem_reg_frameOfsts) = extract_reg_config(clem_lines)
-  (their_clem_r_reg_minors, their_clem_r_reg_frameOfsts) = extract_reg_config(clem_r_lines)
-
-  # Check LUTs
-  for letter in "ABCDEFGH":
-    lut_key = f"{letter}6LUT"
-    (our_clel_l_lut_minors, our_clel_l_lut_frameOfsts) = arch_summary.get_lut_loc("CLEL_L", 0, lut_key)
-    (our_clel_r_lut_minors, our_clel_r_lut_frameOfsts) = arch_summary.get_lut_loc("CLEL_R", 0, lut_key)
-    (our_clem_lut_minors, our_clem_lut_frameOfsts) = arch_summary.get_lut_loc("CLEM", 0, lut_key)
-    (our_clem_r_lut_minors, our_clem_r_lut_frameOfsts) = arch_summary.get_lut_loc("CLEM_R", 0, lut_key)
-
-    assert our_clel_l_lut_minors == their_clel_l_lut_minors[lut_key]
-    assert our_clel_l_lut_frameOfsts == their_clel_l_lut_frameOfsts[lut_key]
-    assert our_clel_r_lut_minors == their_clel_r_lut_minors[lut_key]
-    assert our_clel_r_lut_frameOfsts == their_clel_r_lut_frameOfsts[lut_key]
-    assert our_clem_lut_minors == their_clem_lut_minors[lut_key]
-    assert our_clem_lut_frameOfsts == their_clem_lut_frameOfsts[lut_key]
-    assert our_clem_r_lut_minors == their_clem_r_lut_minors[lut_key]
-    assert our_clem_r_lut_frameOfsts == their_clem_r_lut_frameOfsts[lut_key]
-
-  # Check regs
-  for letter in "ABCDEFGH":
-    for idx in ["", "2"]:
-      reg_key = f"{letter}FF{idx}"
-      (our_clel_l_reg_minors, our_clel_l_reg_frameOfsts) = arch_summary.get_reg_loc("CLEL_L", 0, reg_key)
-      (our_clel_r_reg_minors, our_clel_r_reg_frameOfsts) = arch_summary.get_reg_loc("CLEL_R", 0, reg_key)
-      (our_clem_reg_minors, our_clem_reg_frameOfsts) = arch_summary.get_reg_loc("CLEM", 0, reg_key)
-      (our_clem_r_reg_minors, our_clem_r_reg_frameOfsts) = arch_summary.get_reg_loc("CLEM_R", 0, reg_key)
-
-      assert our_clel_l_reg_minors == their_clel_l_reg_minors[reg_key]
-      assert our_clel_l_reg_frameOfsts == their_clel_l_reg_frameOfsts[reg_key]
-      assert our_clel_r_reg_minors == their_clel_r_reg_minors[reg_key]
-      assert our_clel_r_reg_frameOfsts == their_clel_r_reg_frameOfsts[reg_key]
-      assert our_clem_reg_minors == their_clem_reg_minors[reg_key]
-      assert our_clem_reg_frameOfsts == their_clem_reg_frameOfsts[reg_key]
-      assert our_clem_r_reg_minors == their_clem_r_reg_minors[reg_key]
-      assert our_clem_r_reg_frameOfsts == their_clem_r_reg_frameOfsts[reg_key]
-
+  tileType_dbFile = {
+    "CLEL_L": args.uray_clel_l_db,
+    "CLEL_R": args.uray_clel_r_db,
+    "CLEM": args.uray_clem_db,
+    "CLEM_R": args.uray_clem_r_db,
+  }
+
+  #   tile_type -> (lut_minors, lut_frameOfsts, reg_minors, reg_frameOfsts)
+  # The DB files are independent, so they are parsed in parallel.
+  configs = joblib.Parallel(n_jobs=args.process_cnt)(
+    joblib.delayed(extract_db_configs)(db_file)
+    for db_file in tileType_dbFile.values()
+  )
+  their_configs = dict(zip(tileType_dbFile, configs))
+
+  # Our locations are looked up once per tile type and resource.
+  #   tile_type -> resource -> (minors, frame_ofsts)
+  our_lutLocs = {
+    tile_type: {
+      lut_key: arch_summary.get_lut_loc(tile_type, 0, lut_key)
+      for lut_key in _LUT_KEYS
+    }
+    for tile_type in tileType_dbFile
+  }
+  #   tile_type -> resource -> (minor, frame_ofst)
+  our_regLocs = {
+    tile_type: {
+      reg_key: arch_summary.get_reg_loc(tile_type, 0, reg_key)
+      for reg_key in _REG_KEYS
+    }
+    for tile_type in tileType_dbFile
+  }
+
+  for (tile_type, (their_lut_minors, their_lut_frameOfsts, their_reg_minors, their_reg_frameOfsts)) in their_configs.items():
+    # Check LUTs. Our tuples are compared to the packed int arrays of U-Ray's locations
+    # with np.array_equal(), which compares all bits of a LUT at once.
+    luts_equal = all(
+      np.array_equal(our_lutLocs[tile_type][lut_key][0], their_lut_minors[lut_key]) and
+      np.array_equal(our_lutLocs[tile_type][lut_key][1], their_lut_frameOfsts[lut_key])
+      for lut_key in _LUT_KEYS
+    )
+    assert luts_equal, f"Error: {tile_type} LUT locations differ from U-Ray's!"
+
+    # Check regs. All FFs of a tile type are gathered in tuples and compared with a
+    # single equality, which short-circuits at the first mismatch.
+    our_regs = tuple(our_regLocs[tile_type][reg_key] for reg_key in _REG_KEYS)
+    their_regs = tuple(
+      (their_reg_minors[reg_key], their_reg_frameOfsts[reg_key])
+      for reg_key in _REG_KEYS
+    )
+    assert our_regs == their_regs, f"Error: {tile_type} FF locations differ from U-Ray's!"
 
   print(f"All OK")